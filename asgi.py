@@ -1,16 +1,20 @@
 """
-ASGI config for personal_blog project.
+ASGI config for the Classics On Screen project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving through ASGI lets the async views (contact, register, reset and the
+admin IMDB search) wait on SMTP and OMDb without tying up a worker, e.g.:
+
+    uvicorn ClassicsOnScreen.asgi:application --workers 2
 
 For more information on this file, see
-https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "personal_blog.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ClassicsOnScreen.settings")
 
 application = get_asgi_application()
@@ -1,20 +1,37 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from blog.models import Film, Comment, Show, Location, SiteUser, ShowCreditLog, VenueOwner, ShowOption, FAQ
+from blog.models import Film, Comment, Show, Location, SiteUser, ShowCreditLog, VenueOwner, ShowOption, FAQ, BulkActionJob, CreditGrant, ArchivedShow, ArchivedCreditLog, ArchivedComment
 from django.utils.timezone import now
 from django.core.mail import send_mail
-from django.db.models import Sum
+from django.db.models import F
 from django.conf import settings
 from django.urls import path
 from django.utils.html import format_html
 from django.shortcuts import render
 from django.http import JsonResponse, HttpResponseRedirect
-import requests
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.cache import never_cache
+from blog.omdb import asearch_movies, OMDbError
+from blog.invalidation import coalesce
+from blog import bulk, ledger
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 import csv
 from io import StringIO
 from django.contrib import messages
 
 
+class CoalescedInvalidationMixin:
+    """
+    Bump cache version stamps once per admin action or list_editable save,
+    rather than once for every row touched. Both run inside changelist_view.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        with coalesce():
+            return super().changelist_view(request, extra_context)
+
+
 # Inline configuration for shows created by a user
 class ShowInline(admin.TabularInline):
     model = Show
@@ -42,9 +59,37 @@ class ShowCreditLogAdmin(admin.ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('view_log/<int:show_id>/', self.admin_site.admin_view(self.view_log), name='view_log'),
+            path('ledger/', self.admin_site.admin_view(self.ledger_report), name='blog_ledger_report'),
         ]
         return custom_urls + urls
 
+    def ledger_report(self, request):
+        """Show (and on POST, repair) balances that disagree with the credit log."""
+        report = ledger.check()
+        if request.method == 'POST' and request.user.is_superuser:
+            repaired = ledger.repair(report)
+            self.message_user(
+                request,
+                f"Repaired {len(repaired.shows)} show and {len(repaired.users)} user balances."
+            )
+            if repaired.skipped_shows or repaired.skipped_users:
+                self.message_user(
+                    request,
+                    f"Skipped balances that matched the ledger by the time they were repaired (shows "
+                    f"{', '.join(map(str, repaired.skipped_shows)) or 'none'}; users "
+                    f"{', '.join(map(str, repaired.skipped_users)) or 'none'}).",
+                    level=messages.INFO,
+                )
+            return HttpResponseRedirect(request.path)
+
+        context = {
+            'title': "Credit Ledger",
+            'report': report,
+            'can_repair': request.user.is_superuser,
+            'back_to_show_credits_url': reverse('admin:blog_showcreditlog_changelist'),
+        }
+        return render(request, 'admin/ledger_report.html', context)
+
     def view_log(self, request, show_id):
         # Get all ShowCreditLog entries for a specific show
         show = Show.objects.get(id=show_id)
@@ -61,17 +106,18 @@ class ShowCreditLogAdmin(admin.ModelAdmin):
 
 # Admin configuration for Film
 @admin.register(Film)
-class FilmAdmin(admin.ModelAdmin):
+class FilmAdmin(CoalescedInvalidationMixin, admin.ModelAdmin):
     list_display = ('name', 'active', 'imdb_code', 'EDI_number')
     list_filter = ('active',)
     search_fields = ('name', 'imdb_code', 'EDI_number')
     ordering = ('name',)
     list_editable = ('active',)
     actions = ['deactivate_films', 'export_active_films']
+    prepopulated_fields = {'slug': ('name',)}
     
     fieldsets = (
         (None, {
-            'fields': ('name', 'imdb_code', 'EDI_number')
+            'fields': ('name', 'slug', 'imdb_code', 'EDI_number')
         }),
         ('Status', {
             'fields': ('active',),
@@ -87,34 +133,19 @@ class FilmAdmin(admin.ModelAdmin):
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
-            path('imdb-search/', self.admin_site.admin_view(self.imdb_search), name='imdb-search'),
+            # admin_view() only wraps sync views, so the async search view is
+            # protected with the equivalent async-aware decorators instead.
+            path('imdb-search/', never_cache(staff_member_required(self.imdb_search)), name='imdb-search'),
         ]
         return custom_urls + urls
 
-    def imdb_search(self, request):
+    async def imdb_search(self, request):
         if 'term' in request.GET:
             try:
-                response = requests.get(
-                    'http://www.omdbapi.com/',
-                    params={
-                        's': request.GET['term'],
-                        'apikey': settings.OMDB_API_KEY,
-                        'type': 'movie'
-                    }
-                )
-                data = response.json()
-                if data.get('Response') == 'True':
-                    results = [
-                        {
-                            'id': movie['imdbID'],
-                            'text': f"{movie['Title']} ({movie['Year']})",
-                            'title': movie['Title']
-                        }
-                        for movie in data.get('Search', [])
-                    ]
-                    return JsonResponse({'results': results})
-            except Exception as e:
+                results = await asearch_movies(request.GET['term'])
+            except OMDbError as e:
                 return JsonResponse({'error': str(e)}, status=500)
+            return JsonResponse({'results': results})
         return JsonResponse({'results': []})
 
     def deactivate_films(self, request, queryset):
@@ -133,7 +164,7 @@ class FilmAdmin(admin.ModelAdmin):
             
             # Deactivate film
             film.active = False
-            film.save()
+            film.save(update_fields=['active'])
 
             success_films.append(film)
 
@@ -244,52 +275,62 @@ class FilmAdmin(admin.ModelAdmin):
 
 # Admin configuration for Show
 @admin.register(Show)
-class ShowAdmin(admin.ModelAdmin):
+class ShowAdmin(CoalescedInvalidationMixin, admin.ModelAdmin):
     list_display = ('film', 'location', 'eventtime', 'credits', 'status')
     list_filter = ('status', 'location', 'eventtime')
     actions = ['mark_confirmed', 'mark_cancelled', 'mark_completed', 'refund_credits', 'email_guest_lists', 'mark_expired']
 
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                'bulk-jobs/<int:job_id>/',
+                self.admin_site.admin_view(self.bulk_job_status),
+                name='blog_show_bulk_job',
+            ),
+        ]
+        return custom_urls + urls
+
+    def queue_bulk_action(self, request, queryset, action):
+        """Hand the selected shows to the background runner (see blog.bulk)."""
+        job = bulk.enqueue(action, queryset, request.user)
+        return HttpResponseRedirect(reverse('admin:blog_show_bulk_job', args=[job.pk]))
+
+    def bulk_job_status(self, request, job_id):
+        job = get_object_or_404(BulkActionJob, pk=job_id)
+        context = {
+            'title': str(job),
+            'job': job,
+            'back_to_shows_url': reverse('admin:blog_show_changelist'),
+        }
+        if request.htmx:
+            return render(request, 'admin/bulk_action_job_progress.html', context)
+        return render(request, 'admin/bulk_action_job.html', context)
+
     def mark_confirmed(self, request, queryset):
-        for show in queryset:
-            show.confirm_show()
-        self.message_user(request, "Selected shows have been marked as confirmed.")
+        return self.queue_bulk_action(request, queryset, 'confirm')
 
     def mark_cancelled(self, request, queryset):
-        for show in queryset:
-            show.cancel_show()
-        self.message_user(request, "Selected shows have been marked as cancelled and credits refunded.")
+        return self.queue_bulk_action(request, queryset, 'cancel')
 
     def mark_completed(self, request, queryset):
-        for show in queryset:
-            if show.eventtime < now():
-                show.mark_completed()
-                self.message_user(request, f"Show '{show}' has been marked as completed.")
-            else:
-                self.message_user(request, f"Show '{show}' cannot be marked as completed because it hasn't occurred yet.", level='error')
+        return self.queue_bulk_action(request, queryset, 'complete')
 
     def refund_credits(self, request, queryset):
-        for show in queryset:
-            show.refund_credits()
-        self.message_user(request, "Credits have been refunded for selected shows.")
+        return self.queue_bulk_action(request, queryset, 'refund')
 
     def mark_expired(self, request, queryset):
         """Mark selected shows as expired if applicable."""
-        for show in queryset:
-            if show.status in ['tbc', 'inactive']: #and show.eventtime <= now():
-                show.mark_expired()
-                self.message_user(request, f"Show '{show}' has been marked as expired.")
-            else:
-                self.message_user(request, f"Show '{show}' cannot be marked as expired because it is not in 'tbc' or 'inactive' status, or it has not passed its event time.", level='error')
+        return self.queue_bulk_action(request, queryset, 'expire')
 
     def email_guest_lists(self, request, queryset):
         """Email the guest list for selected shows."""
         for show in queryset:
             # Generate the guest list
             guest_list = (
-                show.credit_logs.values(
-                    'user__username', 'user__email', 'user__first_name', 'user__last_name'
-                )
-                .annotate(total_credits=Sum('credits'))
+                show.contributions.filter(refunded=False)
+                .values('user__username', 'user__email', 'user__first_name', 'user__last_name')
+                .annotate(total_credits=F('total'))
                 .order_by('-total_credits')
             )
 
@@ -333,7 +374,7 @@ class CommentAdmin(admin.ModelAdmin):
 
 # Admin configuration for VenueOwner
 @admin.register(VenueOwner)
-class VenueOwnerAdmin(admin.ModelAdmin):
+class VenueOwnerAdmin(CoalescedInvalidationMixin, admin.ModelAdmin):
     list_display = ('name', 'contact_email', 'website')
     search_fields = ('name', 'description', 'contact_email')
     list_filter = ('locations__active',)
@@ -341,13 +382,16 @@ class VenueOwnerAdmin(admin.ModelAdmin):
 
 # Admin configuration for Location
 @admin.register(Location)
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(CoalescedInvalidationMixin, admin.ModelAdmin):
     list_display = ('name', 'owner', 'contact_email', 'min_capacity', 'max_capacity', 'active')
     list_filter = ('active', 'owner')
     search_fields = ('name', 'owner__name', 'contact_email')
     readonly_fields = ('get_contact_emails',)
+    # The owner column and __str__ both need the owner
+    list_select_related = ('owner',)
 
     def get_contact_emails(self, obj):
+        # Served from the cached venue directory (see blog.venues)
         emails = obj.get_contact_emails()
         return "\n".join(emails)
     get_contact_emails.short_description = "All Contact Emails"
@@ -368,6 +412,17 @@ class SiteUserAdmin(UserAdmin):
     )
     inlines = [ShowInline]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Record credit edits so the ledger (blog.ledger) still balances
+        if 'credits' in form.changed_data:
+            delta = (obj.credits or 0) - (form.initial.get('credits') or 0)
+            if delta:
+                CreditGrant.objects.create(
+                    user=obj, amount=delta, reason='adjustment',
+                    note=f"Changed in admin by {request.user.username}",
+                )
+
     def get_readonly_fields(self, request, obj=None):
         """Ensure 'credits' is editable only by superusers."""
         readonly_fields = super().get_readonly_fields(request, obj)
@@ -377,7 +432,7 @@ class SiteUserAdmin(UserAdmin):
 
 
 @admin.register(ShowOption)
-class ShowOptionAdmin(admin.ModelAdmin):
+class ShowOptionAdmin(CoalescedInvalidationMixin, admin.ModelAdmin):
     list_display = ('name', 'active', 'description')
     list_filter = ('active',)
     search_fields = ('name', 'description')
@@ -396,9 +451,71 @@ class ShowOptionAdmin(admin.ModelAdmin):
 
 
 @admin.register(FAQ)
-class FAQAdmin(admin.ModelAdmin):
+class FAQAdmin(CoalescedInvalidationMixin, admin.ModelAdmin):
     list_display = ('question', 'category', 'order', 'active')
     list_filter = ('category', 'active')
     search_fields = ('question', 'answer')
     list_editable = ('order', 'active')
     ordering = ('category', 'order', 'created_on')
+
+
+# Admin configuration for CreditGrant
+@admin.register(CreditGrant)
+class CreditGrantAdmin(admin.ModelAdmin):
+    list_display = ('user', 'amount', 'reason', 'note', 'created_on')
+    list_filter = ('reason',)
+    search_fields = ('user__username', 'note')
+    ordering = ('-created_on',)
+
+
+# Admin configuration for BulkActionJob (read-only history)
+@admin.register(BulkActionJob)
+class BulkActionJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'processed', 'succeeded', 'skipped', 'created_by', 'created_on', 'progress_link')
+    list_filter = ('status', 'action')
+    ordering = ('-created_on',)
+
+    def progress_link(self, obj):
+        url = reverse('admin:blog_show_bulk_job', args=[obj.pk])
+        return format_html('<a href="{}">Progress</a>', url)
+
+    progress_link.short_description = 'Progress'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ReadOnlyAdminMixin:
+    """Archive rows are history: they can be viewed but not added or changed."""
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedCreditLogInline(ReadOnlyAdminMixin, admin.TabularInline):
+    model = ArchivedCreditLog
+    fields = ('user', 'credits', 'refunded', 'created_on')
+    extra = 0
+
+
+class ArchivedCommentInline(ReadOnlyAdminMixin, admin.TabularInline):
+    model = ArchivedComment
+    fields = ('author', 'body', 'created_on')
+    extra = 0
+
+
+# Admin configuration for ArchivedShow (read-only, see blog.archive)
+@admin.register(ArchivedShow)
+class ArchivedShowAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'film', 'location', 'eventtime', 'status', 'credits', 'archived_on')
+    list_filter = ('status', 'location')
+    search_fields = ('film__name', 'location__name', 'created_by__username')
+    list_select_related = ('film', 'location')
+    date_hierarchy = 'eventtime'
+    inlines = [ArchivedCreditLogInline, ArchivedCommentInline]
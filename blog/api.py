@@ -0,0 +1,306 @@
+"""
+Read-only JSON API (/api/v1/) for shows, films, locations and show options.
+
+Rows are read with values(), so no model instances are built, and lists are
+paged with an opaque keyset cursor on each resource's ordering, so a page
+costs the same however deep a client pages. ?fields= picks a subset of a
+resource's fields. ETags are built from the cache version stamps of the
+models behind a resource (see blog.invalidation), so an unchanged response
+is answered with a 304 before any query runs.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import invalidation
+from .models import Film, Location, Show, ShowOption, VenueOwner
+
+
+class BadRequest(Exception):
+    """An invalid query parameter; reported to the client as a 400."""
+
+
+def _parse_datetime(value):
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise BadRequest(f"Invalid date or time: {value}")
+    if moment.tzinfo is None:
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _ids(value):
+    try:
+        return [int(part) for part in value.split(',')]
+    except ValueError:
+        raise BadRequest(f"Invalid id list: {value}")
+
+
+def _show_filters(params):
+    filters = Q()
+    if 'status' in params:
+        statuses = params['status'].split(',')
+        valid = dict(Show.STATUS_CHOICES)
+        unknown = [status for status in statuses if status not in valid]
+        if unknown:
+            raise BadRequest(f"Unknown status: {', '.join(unknown)}")
+        filters &= Q(status__in=statuses)
+    if 'location' in params:
+        filters &= Q(location_id__in=_ids(params['location']))
+    if 'film' in params:
+        filters &= Q(film_id__in=_ids(params['film']))
+    if 'from' in params:
+        filters &= Q(eventtime__gte=_parse_datetime(params['from']))
+    if 'to' in params:
+        filters &= Q(eventtime__lt=_parse_datetime(params['to']))
+    return filters
+
+
+def _active_filter(params):
+    if 'active' not in params:
+        return Q()
+    if params['active'] not in ('true', 'false'):
+        raise BadRequest("active must be true or false")
+    return Q(active=params['active'] == 'true')
+
+
+class Resource:
+    """
+    One API resource: the queryset it reads, its public fields (name ->
+    values() lookup), the ordering its keyset cursor follows, its filters
+    and the models whose versions stamp its responses.
+    """
+
+    def __init__(self, name, queryset, fields, ordering, filters, models, default_fields=None):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+        self.ordering = ordering
+        self.filters = filters
+        self.models = models
+        self.default_fields = default_fields or list(fields)
+
+    def select(self, params):
+        """The requested field names, in the resource's order."""
+        if 'fields' not in params:
+            return self.default_fields
+        wanted = params['fields'].split(',')
+        unknown = [field for field in wanted if field not in self.fields]
+        if unknown:
+            raise BadRequest(f"Unknown field: {', '.join(unknown)}")
+        return [field for field in self.fields if field in wanted]
+
+    def lookups(self, selected):
+        """values_list() lookups for the selected fields and the ordering."""
+        lookups = list(self.ordering)
+        for field in selected:
+            lookup = self.fields[field]
+            if lookup and lookup not in lookups:
+                lookups.append(lookup)
+        return lookups
+
+    def encode_cursor(self, values):
+        raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+        return urlsafe_base64_encode(raw.encode('utf-8'))
+
+    def after(self, cursor):
+        """Filter for the rows after cursor in the resource's ordering."""
+        try:
+            values = json.loads(urlsafe_base64_decode(cursor).decode('utf-8'))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError(cursor)
+            values = [
+                datetime.fromisoformat(value) if lookup == 'eventtime' else int(value)
+                for lookup, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise BadRequest("Invalid cursor")
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+        condition = Q()
+        for index, lookup in enumerate(self.ordering):
+            step = Q(**{f'{lookup}__gt': values[index]})
+            for previous, value in zip(self.ordering[:index], values[:index]):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+
+def _attach_show_options(rows, show_ids):
+    """Fill in each show's option ids, with one query for the page."""
+    options = {}
+    for show_id, option_id in Show.options.through.objects.filter(
+        show_id__in=show_ids
+    ).values_list('show_id', 'showoption_id').order_by('showoption_id'):
+        options.setdefault(show_id, []).append(option_id)
+    for row, show_id in zip(rows, show_ids):
+        row['options'] = options.get(show_id, [])
+
+
+RESOURCES = {
+    'shows': Resource(
+        'shows',
+        Show.objects.all(),
+        {
+            'id': 'pk',
+            'eventtime': 'eventtime',
+            'status': 'status',
+            'credits': 'credits',
+            'film': 'film_id',
+            'film_name': 'film__name',
+            'film_slug': 'film__slug',
+            'location': 'location_id',
+            'location_name': 'location__name',
+            'min_capacity': 'location__min_capacity',
+            'max_capacity': 'location__max_capacity',
+            'body': 'body',
+            'options': None,  # filled in by _attach_show_options
+            'last_modified': 'last_modified',
+        },
+        ordering=('eventtime', 'pk'),
+        filters=_show_filters,
+        models=(Show, Film, Location),
+    ),
+    'films': Resource(
+        'films',
+        Film.objects.all(),
+        {
+            'id': 'pk',
+            'name': 'name',
+            'slug': 'slug',
+            'description': 'description',
+            'imdb_code': 'imdb_code',
+            'active': 'active',
+        },
+        ordering=('pk',),
+        filters=_active_filter,
+        models=(Film,),
+    ),
+    'locations': Resource(
+        'locations',
+        Location.objects.all(),
+        {
+            'id': 'pk',
+            'name': 'name',
+            'owner': 'owner__name',
+            'min_capacity': 'min_capacity',
+            'max_capacity': 'max_capacity',
+            'active': 'active',
+        },
+        ordering=('pk',),
+        filters=_active_filter,
+        models=(Location, VenueOwner),
+    ),
+    'options': Resource(
+        'options',
+        ShowOption.objects.all(),
+        {
+            'id': 'pk',
+            'name': 'name',
+            'description': 'description',
+            'active': 'active',
+        },
+        ordering=('pk',),
+        filters=_active_filter,
+        models=(ShowOption,),
+    ),
+}
+
+
+def _limit(params):
+    try:
+        limit = int(params.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("limit must be a number")
+    if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+        raise BadRequest(f"limit must be between 1 and {settings.API_MAX_PAGE_SIZE}")
+    return limit
+
+
+def _serialize(resource, queryset, selected):
+    """Rows of queryset as dicts of the selected fields, plus the raw rows."""
+    lookups = resource.lookups(selected)
+    position = {lookup: index for index, lookup in enumerate(lookups)}
+    raw = list(queryset.values_list(*lookups))
+    rows = [
+        {field: row[position[resource.fields[field]]] if resource.fields[field] else None for field in selected}
+        for row in raw
+    ]
+    if 'options' in selected:
+        _attach_show_options(rows, [row[position['pk']] for row in raw])
+    return rows, raw
+
+
+def _list(request, resource):
+    params = request.GET
+    selected = resource.select(params)
+    limit = _limit(params)
+    queryset = resource.queryset.filter(resource.filters(params))
+    if 'cursor' in params:
+        queryset = queryset.filter(resource.after(params['cursor']))
+    queryset = queryset.order_by(*resource.ordering)[:limit + 1]
+
+    rows, raw = _serialize(resource, queryset, selected)
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        query = params.copy()
+        query['cursor'] = resource.encode_cursor(raw[limit - 1][:len(resource.ordering)])
+        next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+    return {'results': rows, 'next': next_url}
+
+
+def _detail(request, resource, pk):
+    selected = resource.select(request.GET)
+    rows, raw = _serialize(resource, resource.queryset.filter(pk=pk), selected)
+    if not rows:
+        raise Http404
+    return rows[0]
+
+
+def _respond(request, resource, build):
+    """
+    Answer with a 304 if the client's ETag matches the current version stamps
+    of the resource's models, otherwise with the JSON build() returns.
+    """
+    stamp = invalidation.versioned_key(request.get_full_path(), *resource.models)
+    etag = f'"{hashlib.md5(stamp.encode()).hexdigest()}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            response = JsonResponse(build())
+        except BadRequest as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Http404:
+            return JsonResponse({'error': 'Not found'}, status=404)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.API_MAX_AGE)
+    return response
+
+
+def resource_list(request, resource):
+    resource = RESOURCES[resource]
+    return _respond(request, resource, lambda: _list(request, resource))
+
+
+def resource_detail(request, resource, pk):
+    resource = RESOURCES[resource]
+    return _respond(request, resource, lambda: _detail(request, resource, pk))
+
+
+urlpatterns = [
+    urlpattern
+    for name in RESOURCES
+    for urlpattern in (
+        path(f'{name}/', resource_list, {'resource': name}, name=f'api_{name}'),
+        path(f'{name}/<int:pk>/', resource_detail, {'resource': name}, name=f'api_{name}_detail'),
+    )
+]
@@ -16,4 +16,6 @@ class BlogConfig(AppConfig):
         """
         Connect signals and perform startup operations
         """
+        from . import signals  # noqa: F401  (registers model signal receivers)
+
         post_migrate.connect(create_default_superuser, sender=self)
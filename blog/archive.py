@@ -0,0 +1,94 @@
+"""
+Archive tier for finished shows.
+
+Shows that completed, were cancelled or expired more than ARCHIVE_AFTER_DAYS
+ago are copied, with their credit logs and comments, into the Archived*
+tables and then deleted from the hot ones, ARCHIVE_CHUNK_SIZE shows per
+transaction. Each chunk either moves completely or not at all, and the next
+run starts from whatever is still eligible, so an interrupted run is resumed
+simply by running again (manage.py archive_shows).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .invalidation import coalesce
+from .models import (
+    ArchivedComment, ArchivedCreditLog, ArchivedShow, Comment, Show, ShowContribution,
+    ShowCreditLog,
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVABLE_STATUSES = ['completed', 'cancelled', 'expired']
+
+
+def eligible(days=None):
+    """Shows finished more than days (default ARCHIVE_AFTER_DAYS) ago."""
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    return Show.objects.filter(status__in=ARCHIVABLE_STATUSES, eventtime__lt=cutoff)
+
+
+def _archive_chunk(queryset):
+    """Move the shows in queryset and their history. Returns the number moved."""
+    shows = list(
+        queryset.select_for_update(of=('self',)).prefetch_related('options')
+    )
+    if not shows:
+        return 0
+    show_ids = [show.pk for show in shows]
+
+    ArchivedShow.objects.bulk_create([
+        ArchivedShow(
+            id=show.pk,
+            body=show.body,
+            created_by_id=show.created_by_id,
+            created_on=show.created_on,
+            last_modified=show.last_modified,
+            film_id=show.film_id,
+            location_id=show.location_id,
+            eventtime=show.eventtime,
+            credits=show.credits or 0,
+            status=show.status,
+            option_names=[option.name for option in show.options.all()],
+        )
+        for show in shows
+    ])
+    ArchivedCreditLog.objects.bulk_create(
+        ArchivedCreditLog(**row)
+        for row in ShowCreditLog.objects.filter(show_id__in=show_ids).values(
+            'id', 'user_id', 'show_id', 'credits', 'refunded', 'created_on'
+        )
+    )
+    ArchivedComment.objects.bulk_create(
+        ArchivedComment(**row)
+        for row in Comment.objects.filter(show_id__in=show_ids).values(
+            'id', 'author_id', 'show_id', 'body', 'created_on'
+        )
+    )
+
+    ShowCreditLog.objects.filter(show_id__in=show_ids).delete()
+    Comment.objects.filter(show_id__in=show_ids).delete()
+    ShowContribution.objects.filter(show_id__in=show_ids).delete()
+    Show.objects.filter(pk__in=show_ids).delete()
+    return len(shows)
+
+
+def archive_shows(days=None, chunk_size=None):
+    """Archive every eligible show, a chunk per transaction. Returns the number moved."""
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+    total = 0
+    while True:
+        # Cache versions are bumped once per chunk, after it commits
+        with coalesce(), transaction.atomic():
+            moved = _archive_chunk(eligible(days).order_by('pk')[:chunk_size])
+        if not moved:
+            break
+        total += moved
+        logger.info(f"Archived {moved} shows ({total} so far)")
+    return total
@@ -0,0 +1,96 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models.functions import Lower
+
+from .models import SiteUser
+
+
+def _normalize(value):
+    return value.strip().lower()
+
+
+def _cache_key(field, value):
+    digest = hashlib.md5(_normalize(value).encode('utf-8')).hexdigest()
+    return f'blog:availability:{field}:{digest}'
+
+
+def _taken_in_db(field, value):
+    """Case-insensitive existence check that can use the Lower() indexes."""
+    return SiteUser.objects.annotate(
+        normalized=Lower(field)
+    ).filter(normalized=_normalize(value)).exists()
+
+
+def is_taken(field, value):
+    """
+    Return True if a user already has this username/email (ignoring case).
+
+    Answers are cached: "taken" for AVAILABILITY_TAKEN_TTL since accounts are
+    rarely deleted, "available" only briefly since someone may register it.
+    New and updated users are written straight into the cache by mark_taken().
+    """
+    key = _cache_key(field, value)
+    taken = cache.get(key)
+    if taken is None:
+        taken = _taken_in_db(field, value)
+        timeout = settings.AVAILABILITY_TAKEN_TTL if taken else settings.AVAILABILITY_AVAILABLE_TTL
+        cache.set(key, taken, timeout)
+    return taken
+
+
+def mark_taken(user):
+    """Record a user's username and email as taken."""
+    entries = {_cache_key('username', user.username): True}
+    if user.email:
+        entries[_cache_key('email', user.email)] = True
+    cache.set_many(entries, settings.AVAILABILITY_TAKEN_TTL)
+
+
+def forget(user):
+    """Drop cached answers for a deleted user's username and email."""
+    keys = [_cache_key('username', user.username)]
+    if user.email:
+        keys.append(_cache_key('email', user.email))
+    cache.delete_many(keys)
+
+
+def client_address(request):
+    """
+    The client's IP address. Behind TRUSTED_PROXY_COUNT proxies it is the
+    entry the outermost trusted proxy appended to CLIENT_ADDRESS_HEADER;
+    entries before it were sent by the client and could be forged.
+    """
+    remote = request.META.get('REMOTE_ADDR', 'unknown')
+    hops = settings.TRUSTED_PROXY_COUNT
+    if not hops:
+        return remote
+    forwarded = [
+        part.strip() for part in request.META.get(settings.CLIENT_ADDRESS_HEADER, '').split(',')
+        if part.strip()
+    ]
+    if len(forwarded) < hops:
+        # The request did not come through every proxy
+        return remote
+    return forwarded[-hops]
+
+
+def check_rate_limit(request):
+    """
+    Count an availability check against the client's budget.
+    Returns False once the client has made more than AVAILABILITY_RATE_LIMIT
+    checks within AVAILABILITY_RATE_WINDOW seconds.
+    """
+    client = client_address(request)
+    key = f'blog:availability:rate:{client}'
+    counters = caches['counters']
+    # add() only creates the counter if it does not exist, starting the window
+    counters.add(key, 0, settings.AVAILABILITY_RATE_WINDOW)
+    try:
+        count = counters.incr(key)
+    except ValueError:
+        # The window expired between add() and incr()
+        counters.set(key, 1, settings.AVAILABILITY_RATE_WINDOW)
+        count = 1
+    return count <= settings.AVAILABILITY_RATE_LIMIT
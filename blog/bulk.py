@@ -0,0 +1,208 @@
+"""
+Background runner for bulk admin actions on shows.
+
+ShowAdmin queues the selected show ids as a BulkActionJob and returns at once.
+The job is worked through BULK_ACTION_CHUNK_SIZE shows at a time, one
+transaction per chunk, with the progress saved in the same transaction so an
+interrupted job can be resumed where it stopped (manage.py run_bulk_actions).
+The running process renews the job's heartbeat with every chunk; only a job
+whose heartbeat has gone stale may be resumed.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .invalidation import coalesce
+from .models import BulkActionJob, Show
+from .transitions import bulk_transition
+
+logger = logging.getLogger(__name__)
+
+
+class Skip(Exception):
+    """Raised by an action for a show it does not apply to."""
+
+
+def _refund(show):
+    if not show.refund_credits():
+        raise Skip(f"Credits for '{show}' can only be refunded once it is cancelled or expired.")
+
+
+# Actions applied show by show, each in its own savepoint
+ACTIONS = {
+    'refund': _refund,
+}
+
+# Actions that are a status change, applied to a whole chunk with one
+# conditional UPDATE (see blog.transitions)
+TRANSITION_ACTIONS = {
+    'confirm': 'confirmed',
+    'cancel': 'cancelled',
+    'complete': 'completed',
+    'expire': 'expired',
+}
+
+
+def enqueue(action, queryset, user):
+    """
+    Queue action for the shows in queryset. With BULK_ACTION_RUNNER = 'thread'
+    the job starts in a background thread once the transaction commits;
+    otherwise it waits for manage.py run_bulk_actions.
+    """
+    show_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    job = BulkActionJob.objects.create(action=action, show_ids=show_ids, created_by=user)
+    if settings.BULK_ACTION_RUNNER == 'thread':
+        transaction.on_commit(lambda: start(job.pk))
+    return job
+
+
+def start(job_id):
+    thread = threading.Thread(
+        target=_run_in_thread, args=(job_id,), name=f'bulk-action-{job_id}', daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        # The thread's connection is not closed by the request cycle
+        connection.close()
+
+
+def _skip_reason(show, target):
+    if target == 'completed' and show.eventtime >= timezone.now():
+        return f"Show '{show}' cannot be marked as completed because it hasn't occurred yet."
+    return f"Show '{show}' cannot move from '{show.get_status_display()}' to '{target}'."
+
+
+def _apply_transition(target, show_ids, job):
+    queryset = Show.objects.filter(pk__in=show_ids)
+    if target == 'completed':
+        queryset = queryset.filter(eventtime__lt=timezone.now())
+    changed = set(bulk_transition(queryset, target))
+    job.succeeded += len(changed)
+
+    skipped = [pk for pk in show_ids if pk not in changed]
+    if skipped:
+        shows = Show.objects.select_related('film', 'location').in_bulk(skipped)
+        for pk in skipped:
+            job.skipped += 1
+            show = shows.get(pk)
+            job.errors.append(
+                _skip_reason(show, target) if show else f"Show {pk} no longer exists."
+            )
+
+
+def _apply(action, show_ids, job):
+    shows = Show.objects.select_related('film', 'location').in_bulk(show_ids)
+    for pk in show_ids:
+        show = shows.get(pk)
+        if show is None:
+            job.skipped += 1
+            job.errors.append(f"Show {pk} no longer exists.")
+            continue
+        try:
+            # A savepoint per show, so one failure does not undo the chunk
+            with transaction.atomic():
+                action(show)
+        except Skip as e:
+            job.skipped += 1
+            job.errors.append(str(e))
+        except Exception as e:
+            logger.exception(f"Bulk action {job.action} failed for show {pk}")
+            job.skipped += 1
+            job.errors.append(f"Show '{show}' failed: {e}")
+        else:
+            job.succeeded += 1
+
+
+class LeaseLost(Exception):
+    """Raised when another process has taken over the job being run."""
+
+
+def _claim(job_id, resume):
+    """
+    Mark the job running under a fresh heartbeat with one conditional UPDATE,
+    so two processes can never both claim it. A queued job is always
+    available; with resume, so is a running job whose heartbeat is older
+    than BULK_ACTION_LEASE_SECONDS.
+    """
+    now = timezone.now()
+    available = Q(status='queued')
+    if resume:
+        cutoff = now - timedelta(seconds=settings.BULK_ACTION_LEASE_SECONDS)
+        available |= Q(status='running') & (Q(heartbeat__lt=cutoff) | Q(heartbeat__isnull=True))
+    claimed = BulkActionJob.objects.filter(available, pk=job_id).update(
+        status='running', started_on=Coalesce('started_on', Value(now)), heartbeat=now
+    )
+    return claimed == 1
+
+
+def _save_progress(job, **fields):
+    """
+    Save the job's progress and renew its heartbeat, provided the heartbeat
+    is still the one this process set; otherwise raise LeaseLost.
+    """
+    heartbeat = timezone.now()
+    updated = BulkActionJob.objects.filter(
+        pk=job.pk, status='running', heartbeat=job.heartbeat
+    ).update(heartbeat=heartbeat, **fields)
+    if not updated:
+        raise LeaseLost(f"Bulk action job {job.pk} was resumed by another process")
+    job.heartbeat = heartbeat
+
+
+def run_job(job_id, resume=False):
+    """
+    Process a queued job. With resume=True a job left 'running' by a process
+    that died (its heartbeat is older than BULK_ACTION_LEASE_SECONDS) is
+    picked up again from its saved position.
+    Returns the finished job, or None if it was not available to run or was
+    taken over part way through.
+    """
+    if not _claim(job_id, resume):
+        return None
+
+    job = BulkActionJob.objects.get(pk=job_id)
+    chunk_size = settings.BULK_ACTION_CHUNK_SIZE
+    logger.info(f"Running bulk action {job.action} on {job.total} shows (job {job.pk})")
+    try:
+        while job.processed < job.total:
+            chunk = job.show_ids[job.processed:job.processed + chunk_size]
+            # Cache versions are bumped once per chunk, after it commits
+            with coalesce(), transaction.atomic():
+                if job.action in TRANSITION_ACTIONS:
+                    _apply_transition(TRANSITION_ACTIONS[job.action], chunk, job)
+                else:
+                    _apply(ACTIONS[job.action], chunk, job)
+                job.processed += len(chunk)
+                # Rolls the chunk back if the job is no longer ours
+                _save_progress(
+                    job, processed=job.processed, succeeded=job.succeeded,
+                    skipped=job.skipped, errors=job.errors,
+                )
+        job.status = 'done'
+    except LeaseLost as e:
+        logger.warning(str(e))
+        return None
+    except Exception:
+        logger.exception(f"Bulk action job {job.pk} stopped")
+        job.refresh_from_db(fields=['processed', 'succeeded', 'skipped', 'errors'])
+        job.status = 'failed'
+    job.finished_on = timezone.now()
+    try:
+        _save_progress(job, status=job.status, finished_on=job.finished_on)
+    except LeaseLost as e:
+        logger.warning(str(e))
+        return None
+    logger.info(job.summary)
+    return job
@@ -0,0 +1,136 @@
+"""
+Cache backends that count hits, misses and evictions.
+
+Each backend is Django's own backend with a metering mixin; the counters are
+kept per process and per cache alias (the "ALIAS" entry in the CACHES config,
+see settings.cache_config). This module is imported while the cache handler
+builds its backends, so it must not import models.
+"""
+import threading
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+_MISSING = object()
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+class CacheMetrics:
+    """Thread-safe hit/miss/eviction counters for one cache alias."""
+
+    fields = ('hits', 'misses', 'evictions')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.fields, 0)
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.fields, 0)
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_rate'] = counts['hits'] / lookups if lookups else None
+        return counts
+
+
+def get_metrics(alias):
+    """Return the counters for a cache alias, creating them on first use."""
+    with _metrics_lock:
+        return _metrics.setdefault(alias, CacheMetrics())
+
+
+class MeteredCacheMixin:
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.alias = params.get('ALIAS', location)
+        self.metrics = get_metrics(self.alias)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            self.metrics.incr('misses')
+            return default
+        self.metrics.incr('hits')
+        return value
+
+    def stats(self):
+        """Counters for this process plus whatever the backend knows about itself."""
+        return self.metrics.snapshot()
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    def _cull(self):
+        # Called with the cache lock held
+        before = len(self._cache)
+        super()._cull()
+        self.metrics.incr('evictions', before - len(self._cache))
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(entries=len(self._cache), max_entries=self._max_entries)
+        return stats
+
+
+class MeteredFileBasedCache(MeteredCacheMixin, FileBasedCache):
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self._culling = threading.local()
+
+    def _cull(self):
+        self._culling.active = True
+        try:
+            super()._cull()
+        finally:
+            self._culling.active = False
+
+    def _delete(self, fname):
+        deleted = super()._delete(fname)
+        if deleted and getattr(self._culling, 'active', False):
+            self.metrics.incr('evictions')
+        return deleted
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(entries=len(self._list_cache_files()), max_entries=self._max_entries)
+        return stats
+
+
+class MeteredRedisCache(MeteredCacheMixin, RedisCache):
+    """
+    Works with any server speaking the Redis protocol (Redis, Valkey, KeyDB...).
+    Evictions happen inside the server, so they are read from INFO rather than
+    counted here.
+    """
+
+    def get_many(self, keys, version=None):
+        # RedisCache fetches in one MGET rather than going through get()
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        self.metrics.incr('hits', len(found))
+        self.metrics.incr('misses', len(keys) - len(found))
+        return found
+
+    def stats(self):
+        stats = super().stats()
+        try:
+            info = self._cache.get_client().info()
+        except Exception as e:
+            stats['server_error'] = str(e)
+            return stats
+        stats.update(
+            evictions=info.get('evicted_keys', 0),
+            server_hits=info.get('keyspace_hits', 0),
+            server_misses=info.get('keyspace_misses', 0),
+            used_memory=info.get('used_memory_human', ''),
+        )
+        return stats
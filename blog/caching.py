@@ -0,0 +1,128 @@
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .invalidation import versioned_key
+from .models import FAQ, Film, Show, ShowOption
+from .templatetags.custom_filters import replace_settings
+
+# Entries are keyed on the model version stamps (see blog.invalidation), so a
+# change makes them unreachable; the timeout only reclaims the space.
+STALE_ENTRY_TIMEOUT = 60 * 60 * 24
+
+
+def get_active_show_options():
+    """
+    Return the active show options as a list of (pk, name) tuples.
+    Cached until a ShowOption changes.
+    """
+    key = versioned_key('blog:active_show_options', ShowOption)
+    options = cache.get(key)
+    if options is None:
+        options = list(
+            ShowOption.objects.filter(active=True).values_list('pk', 'name')
+        )
+        cache.set(key, options, STALE_ENTRY_TIMEOUT)
+    return options
+
+
+def get_film_slug_for_name(name):
+    """
+    Return the slug of the film called name, or None, for redirecting the
+    old name-based film URLs. Names are not unique; the oldest film wins.
+    Cached, misses included, until a Film changes.
+    """
+    digest = hashlib.md5(name.encode('utf-8')).hexdigest()
+    key = versioned_key(f'blog:film_slug:{digest}', Film)
+    slug = cache.get(key)
+    if slug is None:
+        slug = Film.objects.filter(name=name).order_by('pk').values_list('slug', flat=True).first() or ''
+        cache.set(key, slug, STALE_ENTRY_TIMEOUT)
+    return slug or None
+
+
+def get_month_calendar(year, month, location_id=None):
+    """
+    Return {date: {status: count}} for the shows in a month, site-wide or at
+    one location, from one grouped query over (location, eventtime).
+    Days are in the current time zone. Cached until a Show changes.
+    """
+    scope = location_id or 'all'
+    key = versioned_key(f'blog:calendar:{scope}:{year}-{month:02d}', Show)
+    days = cache.get(key)
+    if days is None:
+        start = timezone.make_aware(datetime(year, month, 1))
+        end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+        shows = Show.objects.filter(eventtime__gte=start, eventtime__lt=end)
+        if location_id:
+            shows = shows.filter(location_id=location_id)
+        rows = shows.annotate(day=TruncDate('eventtime')).values('day', 'status').annotate(
+            count=Count('id')
+        ).order_by()
+        days = {}
+        for row in rows:
+            days.setdefault(row['day'], {})[row['status']] = row['count']
+        cache.set(key, days, STALE_ENTRY_TIMEOUT)
+    return days
+
+
+def _faq_keys():
+    # The substituted answers depend on MAX_FILM_VOTES, so it is part of the key
+    stamp = versioned_key(f'votes{settings.MAX_FILM_VOTES}', FAQ)
+    return f'blog:faq:data:{stamp}', f'blog:faq:response:{stamp}'
+
+
+def _get_faq_data():
+    data_key, _ = _faq_keys()
+    data = cache.get(data_key)
+    if data is None:
+        categories = dict(FAQ.CATEGORY_CHOICES)
+        faqs_by_category = {}
+        faqs = FAQ.objects.filter(active=True).order_by(
+            'category', 'order', 'created_on'
+        ).values('id', 'category', 'question', 'answer', 'updated_on')
+        for faq in faqs:
+            category = categories.get(faq['category'], faq['category'])
+            faq['answer'] = replace_settings(faq['answer'])
+            faqs_by_category.setdefault(category, []).append(faq)
+        all_faqs = [faq for group in faqs_by_category.values() for faq in group]
+        data = {
+            'faqs_by_category': faqs_by_category,
+            'last_modified': max((faq['updated_on'] for faq in all_faqs), default=None),
+            'count': len(all_faqs),
+        }
+        cache.set(data_key, data, STALE_ENTRY_TIMEOUT)
+    return data
+
+
+def get_faq_page_data():
+    """
+    Return active FAQs grouped by category display name, with settings
+    placeholders already substituted into each answer.
+    Cached until an FAQ changes.
+    """
+    return _get_faq_data()['faqs_by_category']
+
+
+def get_faq_stamp():
+    """Return (last_modified, count) for the active FAQs, from the same cache entry."""
+    data = _get_faq_data()
+    return data['last_modified'], data['count']
+
+
+def get_cached_faq_response():
+    """Return the cached (content, content_type) for the anonymous FAQ page."""
+    _, response_key = _faq_keys()
+    return caches['fragments'].get(response_key)
+
+
+def set_cached_faq_response(response):
+    _, response_key = _faq_keys()
+    caches['fragments'].set(
+        response_key, (response.content, response['Content-Type']), STALE_ENTRY_TIMEOUT
+    )
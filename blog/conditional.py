@@ -0,0 +1,78 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def _make_etag(request, last_modified, token):
+    """
+    Build a weak ETag for the page. Besides the data stamp it covers the full
+    path (filters), HTMX partial vs full page, the viewing user (the sidebar is
+    user-specific) and today's date (expiry countdowns change daily).
+    """
+    user = request.user
+    parts = [
+        request.get_full_path(),
+        'htmx' if getattr(request, 'htmx', False) else 'page',
+        str(user.pk) if user.is_authenticated else 'anon',
+        timezone.localdate().isoformat(),
+        last_modified.isoformat() if last_modified else '',
+        str(token),
+    ]
+    digest = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _patch_page_caching(request, response):
+    """
+    Anonymous pages may be kept by a CDN/reverse proxy for a short time;
+    browsers and logged-in users always revalidate (cheaply, via 304s).
+    """
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=0,
+            s_maxage=settings.PAGE_CACHE_SECONDS,
+        )
+    patch_vary_headers(response, ('Cookie', 'HX-Request'))
+
+
+def conditional_page(stamp_func):
+    """
+    Add conditional GET support (ETag/Last-Modified -> 304) to a page view.
+
+    stamp_func(request, *args, **kwargs) is called with the view's arguments
+    and returns a (last_modified, token) pair describing the data behind the
+    page: the latest modification time (or None) and anything else whose
+    change should invalidate the page, such as a row count. It should cost no
+    more than one aggregate query.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            last_modified, token = stamp_func(request, *args, **kwargs)
+            etag = _make_etag(request, last_modified, token)
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                if not response.has_header('ETag'):
+                    response.headers['ETag'] = etag
+                if timestamp and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(timestamp)
+                _patch_page_caching(request, response)
+            return response
+        return inner
+    return decorator
@@ -12,16 +12,13 @@ def create_test_data():
         defaults={
             'email': 'test@example.com',
             'is_active': True,
-            'credits': 100  # Give the user some initial credits
         }
     )
     if created:
         test_user.set_password('testpass123')
         test_user.save()
-    else:
-        # Update existing user's credits
-        test_user.credits = 100
-        test_user.save()
+    # Give the user 100 credits, recorded so the ledger balances
+    test_user.grant_credits(100 - (test_user.credits or 0), 'adjustment', 'Test data')
     print("Created test user: testuser (password: testpass123) with 100 credits")
 
     # Create locations
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """A subscriber's queue of show events, bound to its event loop."""
+
+    def __init__(self, loop, show_ids, maxsize):
+        self.loop = loop
+        self.show_ids = frozenset(show_ids)
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def wants(self, event):
+        return event['show'] in self.show_ids
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop. A viewer that cannot keep up only
+        # needs the latest state, so the oldest pending event is dropped.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBroker:
+    """
+    In-process pub/sub for show updates.
+
+    publish() may be called from any thread (sync views, admin actions);
+    events are handed to each subscriber's event loop. Only subscribers in
+    the same process see an event, so multi-process deployments need a
+    shared broker with the same interface (see SHOW_EVENTS_BROKER).
+    Also serves as the stand-in broker for tests.
+    """
+
+    def __init__(self, queue_size=20):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self, show_ids):
+        """Register interest in show_ids; must be called from a running event loop."""
+        subscription = Subscription(asyncio.get_running_loop(), show_ids, self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.wants(event)]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                self.unsubscribe(subscription)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by SHOW_EVENTS_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.SHOW_EVENTS_BROKER)()
+    return _broker
+
+
+def show_event(show):
+    """Build the event payload describing a show's booking progress."""
+    return {
+        'show': show.pk,
+        'credits': show.credits or 0,
+        'status': show.status,
+        'status_display': show.get_status_display(),
+        'min_capacity': show.location.min_capacity,
+        'max_capacity': show.location.max_capacity,
+    }
+
+
+def publish_show_update(show):
+    """Publish a show's current state once the surrounding transaction commits."""
+    event = show_event(show)
+    transaction.on_commit(lambda: get_broker().publish(event))
@@ -1,19 +1,44 @@
 from .models import Show, Location, Film, ShowOption
 from django import forms
+from django.db.models.functions import Lower
 from django.contrib.auth.forms import UserCreationForm
 from .models import SiteUser
+from .caching import get_active_show_options
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, Field, HTML, Hidden
 from datetime import datetime
 from django.utils import timezone
 
 
-class ShowFilterForm(forms.Form):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.form_method = 'get'
-        self.helper.layout = Layout(
+class CachedHelperMixin:
+    """
+    Builds the crispy FormHelper once per form class instead of on every
+    instantiation. Subclasses must define a build_helper() classmethod,
+    which is checked when the class is defined; the helper is shared by all
+    instances of the class and must be treated as read-only.
+    """
+    _helpers = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, 'build_helper', None)):
+            raise TypeError(f"{cls.__name__} must define a build_helper() classmethod")
+
+    @property
+    def helper(self):
+        form_class = type(self)
+        helper = CachedHelperMixin._helpers.get(form_class)
+        if helper is None:
+            helper = CachedHelperMixin._helpers[form_class] = form_class.build_helper()
+        return helper
+
+
+class ShowFilterForm(CachedHelperMixin, forms.Form):
+    @classmethod
+    def build_helper(cls):
+        helper = FormHelper()
+        helper.form_method = 'get'
+        helper.layout = Layout(
             Row(
                 Column('location', css_class='form-group col-md-4 mb-0'),
                 Column('film', css_class='form-group col-md-4 mb-0'),
@@ -22,6 +47,7 @@ class ShowFilterForm(forms.Form):
             ),
             Submit('submit', 'Filter Shows', css_class='btn btn-primary')
         )
+        return helper
 
     location = forms.ModelChoiceField(queryset=Location.objects.all(), required=False, empty_label="All Locations")
     film = forms.ModelChoiceField(queryset=Film.objects.all(), required=False, empty_label="All Films")
@@ -34,12 +60,12 @@ class ShowFilterForm(forms.Form):
     )
 
 
-class ContactForm(forms.Form):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.form_method = 'post'
-        self.helper.layout = Layout(
+class ContactForm(CachedHelperMixin, forms.Form):
+    @classmethod
+    def build_helper(cls):
+        helper = FormHelper()
+        helper.form_method = 'post'
+        helper.layout = Layout(
             Row(
                 Column('name', css_class='form-group col-md-6 mb-3'),
                 Column('email', css_class='form-group col-md-6 mb-3'),
@@ -48,6 +74,7 @@ class ContactForm(forms.Form):
             Field('subject', css_class='mb-3'),
             Field('message', css_class='mb-3'),
         )
+        return helper
 
     name = forms.CharField(
         label="Your Name",
@@ -85,12 +112,12 @@ class ContactForm(forms.Form):
     )
 
 
-class SiteUserCreationForm(UserCreationForm):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.form_method = 'post'
-        self.helper.layout = Layout(
+class SiteUserCreationForm(CachedHelperMixin, UserCreationForm):
+    @classmethod
+    def build_helper(cls):
+        helper = FormHelper()
+        helper.form_method = 'post'
+        helper.layout = Layout(
             Field('username', css_class='mb-3'),
             Row(
                 Column('first_name', css_class='form-group col-md-6 mb-0'),
@@ -107,6 +134,7 @@ class SiteUserCreationForm(UserCreationForm):
                 </div>
             """)
         )
+        return helper
 
     first_name = forms.CharField(
         max_length=30,
@@ -129,20 +157,21 @@ class SiteUserCreationForm(UserCreationForm):
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
-        if SiteUser.objects.filter(email=email).exists():
+        if SiteUser.objects.annotate(normalized=Lower('email')).filter(normalized=email.lower()).exists():
             raise forms.ValidationError("A user with this email address already exists.")
         return email
 
 
-class PasswordResetForm(forms.Form):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.form_method = 'post'
-        self.helper.layout = Layout(
+class PasswordResetForm(CachedHelperMixin, forms.Form):
+    @classmethod
+    def build_helper(cls):
+        helper = FormHelper()
+        helper.form_method = 'post'
+        helper.layout = Layout(
             Field('email', css_class='mb-3'),
             Submit('submit', 'Reset Password', css_class='btn btn-primary')
         )
+        return helper
 
     email = forms.EmailField(
         label="Email Address",
@@ -154,7 +183,7 @@ class PasswordResetForm(forms.Form):
     )
 
 
-class CommentForm(forms.Form):
+class CommentForm(CachedHelperMixin, forms.Form):
     body = forms.CharField(
         label='',
         widget=forms.Textarea(
@@ -169,12 +198,16 @@ class CommentForm(forms.Form):
     def __init__(self, *args, **kwargs):
         self.request = kwargs.pop('request', None)
         super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.form_method = 'post'
-        self.helper.layout = Layout(
+
+    @classmethod
+    def build_helper(cls):
+        helper = FormHelper()
+        helper.form_method = 'post'
+        helper.layout = Layout(
             Field('body', css_class='mb-3'),
             Submit('submit', 'Add Comment', css_class='btn btn-primary')
         )
+        return helper
 
     def clean(self):
         cleaned_data = super().clean()
@@ -184,7 +217,7 @@ class CommentForm(forms.Form):
             raise forms.ValidationError("User must be authenticated to comment.")
         return cleaned_data
 
-class ShowForm(forms.ModelForm):
+class ShowForm(CachedHelperMixin, forms.ModelForm):
     event_date = forms.DateField(
         widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
         label="Event Date"
@@ -210,10 +243,22 @@ class ShowForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.form_method = 'post'
-        
-        self.helper.layout = Layout(
+        self.fields['film'].queryset = Film.objects.filter(active=True)
+
+        # Both option widgets render from one cached list; the querysets are
+        # only consulted when a submitted value has to be validated.
+        options = get_active_show_options()
+        self.fields['selected_options'].widget.choices = options
+        self.fields['available_options'].widget.choices = (
+            [('', self.fields['available_options'].empty_label)] + options
+        )
+
+    @classmethod
+    def build_helper(cls):
+        helper = FormHelper()
+        helper.form_method = 'post'
+
+        helper.layout = Layout(
             HTML("""<p class="mt-3">Please remember it takes time to book the film, so your show must be a *minimum* of 3 weeks in the future.</p>"""),
             Field('film', css_class='mb-3'),
             Field('location', css_class='mb-3'),
@@ -231,7 +276,7 @@ class ShowForm(forms.ModelForm):
             """),
             Submit('submit', 'Create Show', css_class='btn btn-primary mt-3')
         )
-        self.fields['film'].queryset = Film.objects.filter(active=True)
+        return helper
 
     class Meta:
         model = Show
@@ -0,0 +1,145 @@
+"""
+iCalendar (.ics) feeds of shows.
+
+Feeds are streamed: events are rendered one at a time from an iterator over
+a values() queryset, so a long feed never sits in memory. Calendar clients
+poll feeds every few minutes, so every response carries an ETag built from
+the latest Show.last_modified, the number of shows in the feed (a show
+leaving the feed changes the count) and the Film and Location version
+stamps (events carry film and venue names), and an unchanged feed costs one
+aggregate query and a 304.
+
+The user feed lists a user's shows without a login, so its URL carries a
+signed token instead of the user id (see user_feed_token).
+"""
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .invalidation import versioned_key
+from .models import Film, Location
+
+USER_FEED_SALT = 'blog.ical.user_feed'
+
+# Show.status -> iCalendar STATUS
+EVENT_STATUS = {
+    'inactive': 'TENTATIVE',
+    'tbc': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+    'expired': 'CANCELLED',
+}
+
+FIELDS = ('pk', 'eventtime', 'last_modified', 'status', 'body', 'film__name', 'location__name')
+
+
+def user_feed_token(user):
+    return signing.dumps(user.pk, salt=USER_FEED_SALT, compress=True)
+
+
+def user_id_from_token(token):
+    """Return the user id signed into token, or None if it is not valid."""
+    try:
+        return signing.loads(token, salt=USER_FEED_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '')
+    )
+
+
+def _fold(line):
+    """Fold a content line into 75-octet pieces, as RFC 5545 requires."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    pieces = []
+    while encoded:
+        size = 75 if not pieces else 74
+        # Never split a multi-byte character
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        pieces.append(encoded[:size].decode('utf-8'))
+        encoded = encoded[size:]
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def _timestamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(show, request, domain):
+    duration = timedelta(minutes=settings.ICAL_EVENT_MINUTES)
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:show-{show['pk']}@{domain}",
+        f"DTSTAMP:{_timestamp(show['last_modified'])}",
+        f"LAST-MODIFIED:{_timestamp(show['last_modified'])}",
+        f"DTSTART:{_timestamp(show['eventtime'])}",
+        f"DTEND:{_timestamp(show['eventtime'] + duration)}",
+        f"SUMMARY:{_escape(show['film__name'])}",
+        f"LOCATION:{_escape(show['location__name'])}",
+        f"DESCRIPTION:{_escape(show['body'] or '')}",
+        f"URL:{request.build_absolute_uri(reverse('blog_detail', args=[show['pk']]))}",
+        f"STATUS:{EVENT_STATUS.get(show['status'], 'TENTATIVE')}",
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+def _stream(shows, request, name):
+    domain = request.get_host().split(':')[0]
+    yield _fold('BEGIN:VCALENDAR')
+    yield _fold('VERSION:2.0')
+    yield _fold(f'PRODID:-//{domain}//Classics On Screen//EN')
+    yield _fold('CALSCALE:GREGORIAN')
+    yield _fold(f'X-WR-CALNAME:{_escape(name)}')
+    yield _fold(f'REFRESH-INTERVAL;VALUE=DURATION:PT{settings.ICAL_REFRESH_MINUTES}M')
+    for show in shows.values(*FIELDS).iterator(chunk_size=500):
+        yield _event(show, request, domain)
+    yield _fold('END:VCALENDAR')
+
+
+def feed_response(request, shows, name, filename, private=False):
+    """
+    Stream shows as an iCalendar feed, or answer 304 if the client's copy
+    is current. private marks feeds that must not be kept by shared caches.
+    """
+    shows = shows.order_by('eventtime', 'pk')
+    stamp = shows.aggregate(last_modified=Max('last_modified'), count=Count('id'))
+    last_modified = stamp['last_modified']
+    # Renaming a film or venue changes every event that names it
+    names = versioned_key(request.path, Film, Location)
+    digest = hashlib.md5(
+        f"{names}|{last_modified.isoformat() if last_modified else ''}|{stamp['count']}".encode()
+    ).hexdigest()
+    etag = f'"{digest}"'
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    # Only the ETag decides: Last-Modified misses film and venue renames
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingHttpResponse(
+            _stream(shows, request, name), content_type='text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    response['ETag'] = etag
+    if timestamp:
+        response['Last-Modified'] = http_date(timestamp)
+    if private:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.ICAL_REFRESH_MINUTES * 60)
+    return response
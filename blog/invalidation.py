@@ -0,0 +1,156 @@
+"""
+Version stamps for cache invalidation.
+
+Every versioned model type has a counter in the "counters" cache that goes up
+whenever a row of that type is saved or deleted (see blog.signals). Each row
+also remembers the type version at its last change. Derived caches put these
+numbers in their keys instead of deleting entries, so a change simply makes
+the old entries unreachable and they age out.
+
+Versions are seeded from the clock in microseconds, so a counter that has been
+evicted or lost with a cache restart comes back larger than before. A row whose
+version has been evicted reports the type version, which is never smaller.
+
+Bumps happen when the primary commits, but a lagging read replica can still
+return the old rows, which would then be cached under the new version until
+the next bump. So for REPLICA_STICKY_SECONDS after any bump every request
+reads from the primary (see recently_bumped() and
+blog.middleware.ReplicaRoutingMiddleware), the same window that pins a
+client to the primary after its own writes. Replicas lagging further than
+that can still leave stale entries.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .routers import replica_enabled
+
+# Present in the counters cache for REPLICA_STICKY_SECONDS after any bump
+RECENT_BUMP_KEY = 'version:recent_bump'
+
+# Per-context pending bumps while coalescing: {label: set of pks or None}
+_pending = ContextVar('invalidation_pending', default=None)
+
+
+def _counters():
+    return caches['counters']
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def _type_key(label):
+    return f'version:{label}'
+
+
+def _row_key(label, pk):
+    return f'version:{label}:{pk}'
+
+
+def _seed():
+    return time.time_ns() // 1000
+
+
+def _ensure(keys):
+    """Return {key: version} for type keys, seeding any that are missing."""
+    counters = _counters()
+    versions = counters.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() keeps whichever process seeded first
+            seed = _seed()
+            counters.add(key, seed)
+            versions[key] = counters.get(key) or seed
+    return versions
+
+
+def get_version(model):
+    """Return the current version of a model type (a model class or 'app.model' label)."""
+    key = _type_key(_label(model))
+    return _ensure([key])[key]
+
+
+def get_versions(*models):
+    """Return the versions of several model types as a tuple, in one cache round trip."""
+    keys = [_type_key(_label(model)) for model in models]
+    versions = _ensure(keys)
+    return tuple(versions[key] for key in keys)
+
+
+def get_row_version(model, pk):
+    """Return the version of a single row."""
+    label = _label(model)
+    type_key, row_key = _type_key(label), _row_key(label, pk)
+    versions = _counters().get_many([row_key, type_key])
+    if row_key in versions:
+        return versions[row_key]
+    return versions.get(type_key) or get_version(label)
+
+
+def versioned_key(name, *models):
+    """Build a cache key for data derived from the given model types."""
+    stamp = '.'.join(str(version) for version in get_versions(*models))
+    return f'{name}:{stamp}'
+
+
+def _bump_now(label, pks):
+    counters = _counters()
+    key = _type_key(label)
+    try:
+        version = counters.incr(key)
+    except ValueError:
+        counters.add(key, _seed())
+        version = counters.incr(key)
+    if pks:
+        counters.set_many({_row_key(label, pk): version for pk in pks})
+    if replica_enabled():
+        counters.set(RECENT_BUMP_KEY, version, settings.REPLICA_STICKY_SECONDS)
+
+
+def recently_bumped():
+    """True within REPLICA_STICKY_SECONDS of any bump, while a replica may still lag it."""
+    return _counters().get(RECENT_BUMP_KEY) is not None
+
+
+def bump(model, pks=None):
+    """
+    Record a change to a model type, and to the given rows if pks is passed.
+
+    The bump happens once the surrounding transaction commits, so the primary
+    never serves pre-commit data under the new version; replica reads are
+    held off for a while after it (see the module docstring). Inside
+    coalesce() bumps are collected and applied once per type when the block
+    exits.
+    """
+    label = _label(model)
+    pks = set(pks) if pks else set()
+    pending = _pending.get()
+    if pending is not None:
+        pending.setdefault(label, set()).update(pks)
+        return
+    transaction.on_commit(lambda: _bump_now(label, pks))
+
+
+@contextmanager
+def coalesce():
+    """
+    Collect the bumps made inside the block and apply each type's once at the
+    end, e.g. for admin actions that save many rows one by one.
+    Nested blocks fold into the outermost one.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+    pending = {}
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+        for label, pks in pending.items():
+            bump(label, pks)
@@ -0,0 +1,137 @@
+"""
+Ledger reconciliation for the denormalized credit balances.
+
+Show.credits should equal the unrefunded ShowCreditLog credits for the show.
+SiteUser.credits should equal the user's CreditGrants less the credits they
+hold on shows (unrefunded log entries, archived ones included). Each model's
+drift is found by one SELECT that reads the stored balance and sums its
+sources side by side, so every row is compared against a consistent snapshot
+and only drifted rows come back. Repairs lock each chunk of rows and recompute
+the sums under the lock before writing, so a balance that changed since the
+check is written with its current expected value, never a stale one.
+"""
+import logging
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, F, Func, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import invalidation
+from .models import ArchivedCreditLog, CreditGrant, Show, ShowCreditLog, SiteUser
+
+logger = logging.getLogger(__name__)
+
+Drift = namedtuple('Drift', ['pk', 'stored', 'expected'])
+
+LedgerReport = namedtuple('LedgerReport', ['shows', 'users', 'elapsed'])
+
+# Ids of the rows each repair() wrote, and of those it left because they
+# no longer drifted once locked
+RepairReport = namedtuple('RepairReport', ['shows', 'users', 'skipped_shows', 'skipped_users'])
+
+
+def _total(queryset, field):
+    """A correlated subquery summing field over queryset, 0 when it is empty."""
+    total = queryset.order_by().annotate(
+        total=Func(F(field), function='SUM', output_field=models.IntegerField())
+    ).values('total')
+    return Coalesce(Subquery(total), Value(0), output_field=models.IntegerField())
+
+
+def _show_expected():
+    return _total(ShowCreditLog.objects.filter(show=OuterRef('pk'), refunded=False), 'credits')
+
+
+def _user_expected():
+    return (
+        _total(CreditGrant.objects.filter(user=OuterRef('pk')), 'amount')
+        - _total(ShowCreditLog.objects.filter(user=OuterRef('pk'), refunded=False), 'credits')
+        - _total(ArchivedCreditLog.objects.filter(user=OuterRef('pk'), refunded=False), 'credits')
+    )
+
+
+def _drift(queryset, expected):
+    """The rows of queryset whose credits differ from expected, in one query."""
+    rows = queryset.annotate(
+        ledger_stored=Coalesce('credits', Value(0), output_field=models.IntegerField()),
+        ledger_expected=expected,
+    ).exclude(ledger_stored=F('ledger_expected')).order_by('pk')
+    return [Drift(*row) for row in rows.values_list('pk', 'credits', 'ledger_expected')]
+
+
+def show_drift():
+    """Shows whose credits differ from their unrefunded log entries."""
+    return _drift(Show.objects.all(), _show_expected())
+
+
+def user_drift():
+    """Users whose credits differ from grants less credits held on shows."""
+    return _drift(SiteUser.objects.all(), _user_expected())
+
+
+def check():
+    """Compute the drift for every show and user."""
+    start = time.perf_counter()
+    shows = show_drift()
+    users = user_drift()
+    return LedgerReport(shows, users, time.perf_counter() - start)
+
+
+def _repair(model, drift, expected, extra=None):
+    """
+    Write expected values in chunks. Each chunk's rows are locked and their
+    drift recomputed under the lock, so the values written are current;
+    rows that no longer drift are skipped. Returns (repaired ids, skipped ids).
+    """
+    chunk_size = settings.LEDGER_REPAIR_CHUNK_SIZE
+    repaired = []
+    skipped = []
+    for start in range(0, len(drift), chunk_size):
+        chunk = [row.pk for row in drift[start:start + chunk_size]]
+        with transaction.atomic():
+            locked = list(model.objects.select_for_update().filter(pk__in=chunk).values_list('pk', flat=True))
+            rows = _drift(model.objects.filter(pk__in=locked), expected)
+            if rows:
+                credits = Case(
+                    *[When(pk=row.pk, then=Value(row.expected)) for row in rows],
+                    default=F('credits'),
+                    output_field=model._meta.get_field('credits'),
+                )
+                model.objects.filter(pk__in=[row.pk for row in rows]).update(credits=credits, **(extra or {}))
+        fixed = {row.pk for row in rows}
+        repaired.extend(pk for pk in chunk if pk in fixed)
+        skipped.extend(pk for pk in chunk if pk not in fixed)
+    return repaired, skipped
+
+
+def repair(report):
+    """Apply the expected balances from a check() report. Returns a RepairReport."""
+    show_ids, skipped_shows = _repair(Show, report.shows, _show_expected(), {'last_modified': timezone.now()})
+    if show_ids:
+        invalidation.bump(Show, show_ids)
+    user_ids, skipped_users = _repair(SiteUser, report.users, _user_expected())
+    logger.warning(
+        f"Ledger repaired {len(show_ids)} show and {len(user_ids)} user balances; "
+        f"skipped {len(skipped_shows)} shows and {len(skipped_users)} users that no longer drifted"
+    )
+    return RepairReport(show_ids, user_ids, skipped_shows, skipped_users)
+
+
+def reconcile(fix=False):
+    """Check the ledger, log any drift and optionally repair it. Returns the report."""
+    report = check()
+    logger.info(
+        f"Ledger check: {len(report.shows)} shows and {len(report.users)} users drifted "
+        f"({report.elapsed:.2f}s)"
+    )
+    for row in report.shows[:20]:
+        logger.warning(f"Show {row.pk} credits {row.stored}, ledger says {row.expected}")
+    for row in report.users[:20]:
+        logger.warning(f"User {row.pk} credits {row.stored}, ledger says {row.expected}")
+    if fix and (report.shows or report.users):
+        repair(report)
+    return report
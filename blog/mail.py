@@ -0,0 +1,33 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import send_mail
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.MAIL_DISPATCH_WORKERS,
+    thread_name_prefix='mail',
+)
+
+# Awaitable send_mail for async views that need to report delivery failures.
+# It runs in a worker thread, so the event loop keeps serving other requests.
+asend_mail = sync_to_async(send_mail, thread_sensitive=False)
+
+
+def _send_and_log(*args, **kwargs):
+    try:
+        send_mail(*args, **kwargs)
+    except Exception:
+        logger.exception("Failed to send mail to %s", kwargs.get('recipient_list'))
+
+
+def dispatch_mail(*args, **kwargs):
+    """
+    Hand a send_mail call to a background thread and return immediately.
+    Takes the same arguments as send_mail. Failures are logged, not raised,
+    and mail still queued when the process exits is lost.
+    """
+    return _executor.submit(_send_and_log, *args, **kwargs)
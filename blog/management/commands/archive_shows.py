@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from blog import archive
+
+
+class Command(BaseCommand):
+    help = 'Move finished shows, with their credit logs and comments, to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Archive shows whose date is more than this many days ago'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.ARCHIVE_CHUNK_SIZE,
+            help='Shows moved per transaction'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report how many shows are eligible without moving them'
+        )
+
+    def handle(self, *args, **options):
+        eligible = archive.eligible(options['days']).count()
+        self.stdout.write(f"{eligible} shows finished more than {options['days']} days ago")
+        if options['dry_run'] or not eligible:
+            return
+
+        moved = archive.archive_shows(options['days'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} shows'))
@@ -0,0 +1,331 @@
+import asyncio
+import copy
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = 'Run micro-benchmarks against the configured database'
+
+    scenarios = ('forms', 'concurrency', 'dbmix', 'sessions')
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=self.scenarios)
+        parser.add_argument(
+            '--iterations', type=int, default=200,
+            help='Number of timed iterations per case'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=50,
+            help='Concurrent requests for the concurrency scenario'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='WSGI worker threads for the concurrency scenario'
+        )
+        parser.add_argument(
+            '--delay', type=float, default=0.5,
+            help='Simulated OMDb response time in seconds'
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Share of operations that write, for the dbmix scenario'
+        )
+
+    def handle(self, *args, **options):
+        handler = getattr(self, f"bench_{options['scenario']}", None)
+        if handler is None:
+            raise CommandError(f"Unknown scenario: {options['scenario']}")
+        handler(options)
+
+    def report(self, label, elapsed, iterations, queries):
+        per_call = elapsed / iterations * 1000
+        self.stdout.write(
+            f"{label:<40} {per_call:8.3f} ms/call  {queries / iterations:6.2f} queries/call"
+        )
+
+    def time_calls(self, func, iterations):
+        """Run func iterations times, returning (seconds, query count)."""
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            elapsed = time.perf_counter() - start
+        return elapsed, len(ctx.captured_queries)
+
+    def bench_forms(self, options):
+        """Per-request form render cost with cold and warm layout/option caches."""
+        from crispy_forms.utils import render_crispy_form
+        from blog.invalidation import bump
+        from blog.models import ShowOption
+        from blog.forms import (
+            CachedHelperMixin, ShowForm, ShowFilterForm, CommentForm,
+            ContactForm, SiteUserCreationForm,
+        )
+
+        iterations = options['iterations']
+        form_classes = [ShowForm, ShowFilterForm, CommentForm, ContactForm, SiteUserCreationForm]
+
+        def cold_render(form_class):
+            CachedHelperMixin._helpers.clear()
+            bump(ShowOption)
+            render_crispy_form(form_class())
+
+        def warm_render(form_class):
+            render_crispy_form(form_class())
+
+        for form_class in form_classes:
+            name = form_class.__name__
+            elapsed, queries = self.time_calls(lambda: cold_render(form_class), iterations)
+            self.report(f"{name} (uncached)", elapsed, iterations, queries)
+            warm_render(form_class)
+            elapsed, queries = self.time_calls(lambda: warm_render(form_class), iterations)
+            self.report(f"{name} (cached)", elapsed, iterations, queries)
+
+    def bench_concurrency(self, options):
+        """
+        Drive the admin IMDB search through the WSGI handler with a fixed pool
+        of worker threads and through the ASGI handler on one event loop,
+        against a local stand-in for OMDb that answers after --delay seconds.
+        """
+        from django.contrib.auth import get_user_model
+        from django.test import AsyncClient, Client, override_settings
+
+        delay = options['delay']
+        total = options['iterations']
+        concurrency = options['concurrency']
+        workers = options['workers']
+
+        class SlowOMDbHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(delay)
+                body = json.dumps({'Response': 'True', 'Search': [
+                    {'imdbID': 'tt0076759', 'Title': 'Star Wars', 'Year': '1977'},
+                ]}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), SlowOMDbHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # The worker threads use their own connections, so the account has
+        # to be committed; it is deleted again when the run ends
+        user = get_user_model().objects.create(
+            username=f'benchmark-staff-{uuid.uuid4().hex[:8]}',
+            is_staff=True, email='benchmark@example.com',
+        )
+        # A distinct term per request, so the "omdb" cache never answers
+        path = '/admin/blog/film/imdb-search/?term=star{}'
+
+        worker_state = threading.local()
+
+        def wsgi_request(i):
+            # One client per worker thread, like one sync worker per process
+            client = getattr(worker_state, 'client', None)
+            if client is None:
+                client = worker_state.client = Client()
+                client.force_login(user)
+            assert client.get(path.format(i)).status_code == 200
+
+        def run_wsgi():
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(wsgi_request, range(total)))
+
+        async def run_asgi():
+            client = AsyncClient()
+            await client.aforce_login(user)
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(i):
+                async with semaphore:
+                    response = await client.get(path.format(i))
+                    assert response.status_code == 200
+
+            await asyncio.gather(*(one(i) for i in range(total)))
+
+        try:
+            # The debug toolbar would dominate the timings; the test client
+            # sends Host: testserver. Cookie sessions leave no session rows.
+            with override_settings(
+                DEBUG=False, ALLOWED_HOSTS=['testserver'],
+                SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+                OMDB_API_URL=f'http://127.0.0.1:{server.server_port}/',
+            ):
+                self._run_concurrency_cases(total, (
+                    (f'WSGI ({workers} worker threads)', run_wsgi),
+                    (f'ASGI (concurrency {concurrency})', lambda: asyncio.run(run_asgi())),
+                ))
+        finally:
+            server.shutdown()
+            user.delete()
+
+    def _run_concurrency_cases(self, total, cases):
+        for label, run in cases:
+            caches['omdb'].clear()
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{label:<40} {total} requests in {elapsed:6.2f}s  "
+                f"{total / elapsed:7.1f} req/s"
+            )
+
+    def bench_dbmix(self, options):
+        """
+        Concurrent mix of listing reads and session-row writes from --workers
+        threads, each with its own connection. On SQLite the current profile
+        is compared with SQLite's defaults (rollback journal, deferred
+        transactions) to show the effect of the WAL/busy-timeout tuning.
+        """
+        from django.conf import settings
+        from django.test import override_settings
+
+        cases = [('current profile', None)]
+        if connection.vendor == 'sqlite':
+            cases.insert(0, ('sqlite defaults', {
+                'pragmas': {'journal_mode': 'DELETE'},
+                'options': {},
+            }))
+
+        database = connections.settings['default']
+        original_options = copy.deepcopy(database['OPTIONS'])
+        try:
+            for label, untuned in cases:
+                connections.close_all()
+                if untuned:
+                    database['OPTIONS'] = untuned['options']
+                    with override_settings(SQLITE_PRAGMAS=untuned['pragmas']):
+                        result = self._run_dbmix(options)
+                else:
+                    database['OPTIONS'] = copy.deepcopy(original_options)
+                    result = self._run_dbmix(options)
+                ops, errors, elapsed = result
+                self.stdout.write(
+                    f"{label:<20} {ops / elapsed:8.1f} ops/s  {errors} lock errors  "
+                    f"({ops} ops, {options['workers']} threads, "
+                    f"{options['write_ratio']:.0%} writes)"
+                )
+        finally:
+            database['OPTIONS'] = original_options
+            connections.close_all()
+            # Leave the file in the configured journal mode
+            if connection.vendor == 'sqlite':
+                connection.ensure_connection()
+
+    def _run_dbmix(self, options):
+        from django.contrib.sessions.backends.db import SessionStore
+        from django.utils import timezone
+        from blog.models import Show
+
+        per_thread = options['iterations']
+        write_ratio = options['write_ratio']
+        counts = {'ops': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker():
+            ops = errors = 0
+            rng = random.Random()
+            try:
+                for _ in range(per_thread):
+                    try:
+                        if rng.random() < write_ratio:
+                            session = SessionStore()
+                            session['benchmark'] = True
+                            session.create()
+                            session.delete()
+                        else:
+                            list(
+                                Show.objects.select_related('film', 'location')
+                                .filter(eventtime__gte=timezone.now())[:50]
+                            )
+                        ops += 1
+                    except OperationalError:
+                        errors += 1
+            finally:
+                connection.close()
+                with lock:
+                    counts['ops'] += ops
+                    counts['errors'] += errors
+
+        threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts['ops'], counts['errors'], time.perf_counter() - start
+
+    def bench_sessions(self, options):
+        """
+        Authenticated page throughput under each session backend: --iterations
+        page views by a logged-in user, every tenth one a POST that adds a
+        flash message. Counts the queries that touch django_session.
+        Runs in a transaction that is rolled back, so the user, the credits
+        it buys and its session rows are not kept.
+        """
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.test import Client, override_settings
+
+        iterations = options['iterations']
+
+        def run(user):
+            client = Client()
+            client.force_login(user)
+            for i in range(iterations):
+                if i % 10 == 9:
+                    response = client.post('/buy-credits/', HTTP_REFERER='/')
+                else:
+                    response = client.get('/')
+                assert response.status_code in (200, 302)
+
+        # The debug toolbar would dominate the timings; the test client
+        # sends Host: testserver
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            user = get_user_model().objects.create(
+                username=f'benchmark-user-{uuid.uuid4().hex[:8]}',
+                email='benchmark-user@example.com',
+            )
+            try:
+                for backend, engine in settings.SESSION_ENGINES.items():
+                    self._run_sessions_case(backend, engine, lambda: run(user), iterations)
+            finally:
+                transaction.set_rollback(True)
+
+    def _run_sessions_case(self, backend, engine, run, iterations):
+        from django.test import override_settings
+
+        with override_settings(SESSION_ENGINE=engine):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+        session_queries = [
+            q for q in ctx.captured_queries if 'django_session' in q['sql']
+        ]
+        writes = sum(
+            1 for q in session_queries
+            if not q['sql'].lstrip().upper().startswith('SELECT')
+        )
+        self.stdout.write(
+            f"{backend:<20} {iterations / elapsed:8.1f} req/s  "
+            f"{len(session_queries) / iterations:5.2f} session queries/req  "
+            f"{writes} session writes"
+        )
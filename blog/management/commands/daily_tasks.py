@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
-from blog.tasks import check_show_expiry
+from blog.tasks import (
+    archive_finished_shows, check_show_expiry, clear_expired_sessions, reconcile_ledger,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,6 +14,15 @@ class Command(BaseCommand):
         
         # Check for expiring shows
         check_show_expiry()
+
+        # Remove expired sessions so the session table stays small
+        clear_expired_sessions()
+
+        # Check credit balances against the credit log
+        reconcile_ledger()
+
+        # Move long-finished shows out of the hot tables
+        archive_finished_shows()
         
         # Future tasks can be added here:
         # clean_expired_votes()
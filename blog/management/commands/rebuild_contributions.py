@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min, Q, Sum
+from blog.models import ShowContribution, ShowCreditLog
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ShowContribution totals from the ShowCreditLog audit trail'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report differences without changing anything'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows written per INSERT or DELETE'
+        )
+
+    def expected_contributions(self):
+        """One grouped query over the log: {(user_id, show_id): ShowContribution}."""
+        rows = ShowCreditLog.objects.values('user_id', 'show_id').annotate(
+            held=Sum('credits', filter=Q(refunded=False), default=0),
+            first=Min('created_on'),
+            latest=Max('created_on'),
+        ).order_by()
+        return {
+            (row['user_id'], row['show_id']): ShowContribution(
+                user_id=row['user_id'],
+                show_id=row['show_id'],
+                total=row['held'],
+                refunded=row['held'] == 0,
+                created_on=row['first'],
+                updated_on=row['latest'],
+            )
+            for row in rows
+        }
+
+    def handle(self, *args, **options):
+        expected = self.expected_contributions()
+        current = {
+            (row['user_id'], row['show_id']): (row['pk'], row['total'], row['refunded'])
+            for row in ShowContribution.objects.values('pk', 'user_id', 'show_id', 'total', 'refunded')
+        }
+
+        changed = [
+            contribution for key, contribution in expected.items()
+            if current.get(key, (None,))[1:] != (contribution.total, contribution.refunded)
+        ]
+        stale = [row[0] for key, row in current.items() if key not in expected]
+
+        self.stdout.write(
+            f"{len(expected)} contributions in the log: "
+            f"{len(changed)} missing or wrong, {len(stale)} without log entries"
+        )
+        if options['dry_run'] or not (changed or stale):
+            return
+
+        with transaction.atomic():
+            ShowContribution.objects.bulk_create(
+                changed,
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['user', 'show'],
+                update_fields=['total', 'refunded', 'updated_on'],
+            )
+            batch_size = options['batch_size']
+            for start in range(0, len(stale), batch_size):
+                ShowContribution.objects.filter(pk__in=stale[start:start + batch_size]).delete()
+        self.stdout.write(self.style.SUCCESS('Contributions rebuilt'))
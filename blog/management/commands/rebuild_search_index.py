@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from blog import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents for films, shows, venues and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Objects indexed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        search.clear()
+        for kind, (model, build, related) in search.INDEXERS.items():
+            count = search.index_queryset(kind, model.objects.all(), options['batch_size'])
+            self.stdout.write(f"Indexed {count} {model._meta.verbose_name_plural.lower()}")
+        search.optimize()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from blog.bulk import run_job
+from blog.models import BulkActionJob
+
+
+class Command(BaseCommand):
+    help = 'Process queued bulk admin actions (for BULK_ACTION_RUNNER = "command", or to resume interrupted jobs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resume', action='store_true',
+            help="Also pick up jobs left 'running' by a process that stopped (no progress for BULK_ACTION_LEASE_SECONDS)"
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['queued', 'running'] if options['resume'] else ['queued']
+        job_ids = BulkActionJob.objects.filter(status__in=statuses).order_by('created_on').values_list('pk', flat=True)
+        for job_id in list(job_ids):
+            job = run_job(job_id, resume=options['resume'])
+            if job is not None:
+                self.stdout.write(job.summary)
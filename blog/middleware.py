@@ -0,0 +1,76 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .invalidation import recently_bumped
+from .routers import _read_from_replica, replica_enabled
+
+STICKY_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route read-only views (REPLICA_READ_VIEWS) to the replica database.
+
+    After any write request the client gets a short-lived cookie that pins
+    it to the primary for REPLICA_STICKY_SECONDS, so users see their own
+    changes even if the replica lags. A cookie is used rather than the
+    session to avoid a session write on every POST. For the same window
+    after any cache version bump, every client reads from the primary, so
+    entries cached under the new version are never filled from a replica
+    that has not caught up (see blog.invalidation).
+
+    Supports both sync and async handling, so async views under ASGI are not
+    funnelled through the single sync thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # process_view() may switch the flag on for this request
+        token = _read_from_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        return self._pin_after_write(request, response)
+
+    async def __acall__(self, request):
+        # Under ASGI, process_view() runs through sync_to_async, which copies
+        # its context changes back into this one
+        token = _read_from_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        return self._pin_after_write(request, response)
+
+    def _pin_after_write(self, request, response):
+        if request.method not in SAFE_METHODS and replica_enabled():
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if (
+            request.method in SAFE_METHODS
+            and match is not None
+            and match.url_name in settings.REPLICA_READ_VIEWS
+            and STICKY_COOKIE not in request.COOKIES
+            and not recently_bumped()
+        ):
+            _read_from_replica.set(True)
+        return None
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0006_add_initial_faqs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='siteuser',
+            name='email',
+            field=models.EmailField(blank=True, db_index=True, max_length=254, verbose_name='email address'),
+        ),
+        migrations.AddIndex(
+            model_name='siteuser',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='siteuser_username_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='siteuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='siteuser_email_lower_idx'),
+        ),
+    ]
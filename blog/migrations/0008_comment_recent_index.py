@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_siteuser_email_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['-created_on', '-id'], 'verbose_name': 'Comment', 'verbose_name_plural': 'Comments'},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['show', '-created_on', '-id'], name='comment_show_recent_idx'),
+        ),
+    ]
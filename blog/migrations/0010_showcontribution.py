@@ -0,0 +1,60 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, Min, Q, Sum
+
+
+def populate_contributions(apps, schema_editor):
+    """Build the running totals from the existing credit log."""
+    ShowCreditLog = apps.get_model('blog', 'ShowCreditLog')
+    ShowContribution = apps.get_model('blog', 'ShowContribution')
+    rows = ShowCreditLog.objects.values('user_id', 'show_id').annotate(
+        held=Sum('credits', filter=Q(refunded=False), default=0),
+        first=Min('created_on'),
+        latest=Max('created_on'),
+    ).order_by()
+    ShowContribution.objects.bulk_create(
+        (
+            ShowContribution(
+                user_id=row['user_id'],
+                show_id=row['show_id'],
+                total=row['held'],
+                refunded=row['held'] == 0,
+                created_on=row['first'],
+                updated_on=row['latest'],
+            )
+            for row in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_bulkactionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShowContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0, help_text='Credits currently held on the show')),
+                ('refunded', models.BooleanField(default=False)),
+                ('created_on', models.DateTimeField(help_text='First contribution')),
+                ('updated_on', models.DateTimeField(help_text='Latest contribution or refund')),
+                ('show', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='blog.show')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Show Contribution',
+                'verbose_name_plural': 'Show Contributions',
+                'ordering': ['created_on'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'show'), name='unique_show_contribution')],
+            },
+        ),
+        migrations.RunPython(populate_contributions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def record_opening_balances(apps, schema_editor):
+    """
+    Grant each user what they hold now plus what they hold on shows, so the
+    ledger starts balanced.
+    """
+    SiteUser = apps.get_model('blog', 'SiteUser')
+    CreditGrant = apps.get_model('blog', 'CreditGrant')
+    users = SiteUser.objects.annotate(
+        held=Sum('showcreditlog__credits', filter=Q(showcreditlog__refunded=False), default=0)
+    ).values_list('pk', 'credits', 'held')
+    grants = []
+    for pk, credits, held in users.iterator(chunk_size=1000):
+        opening = (credits or 0) + held
+        if opening:
+            grants.append(CreditGrant(user_id=pk, amount=opening, reason='opening'))
+    CreditGrant.objects.bulk_create(grants, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_showcontribution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditGrant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(help_text='Negative for deductions')),
+                ('reason', models.CharField(choices=[('opening', 'Opening balance'), ('purchase', 'Purchase'), ('adjustment', 'Admin adjustment')], max_length=20)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_grants', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Credit Grant',
+                'verbose_name_plural': 'Credit Grants',
+                'ordering': ['created_on'],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
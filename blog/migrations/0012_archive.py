@@ -0,0 +1,68 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_creditgrant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedShow',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('body', models.TextField()),
+                ('created_on', models.DateTimeField()),
+                ('last_modified', models.DateTimeField()),
+                ('eventtime', models.DateTimeField()),
+                ('credits', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('inactive', 'Inactive'), ('tbc', 'To Be Confirmed'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed'), ('expired', 'Expired')], max_length=10)),
+                ('option_names', models.JSONField(default=list)),
+                ('archived_on', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_shows', to=settings.AUTH_USER_MODEL)),
+                ('film', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_shows', to='blog.film')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_shows', to='blog.location')),
+            ],
+            options={
+                'verbose_name': 'Archived Show',
+                'verbose_name_plural': 'Archived Shows',
+                'ordering': ['-eventtime'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedCreditLog',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('credits', models.PositiveIntegerField()),
+                ('refunded', models.BooleanField(default=False)),
+                ('created_on', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_credit_logs', to=settings.AUTH_USER_MODEL)),
+                ('show', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_logs', to='blog.archivedshow')),
+            ],
+            options={
+                'verbose_name': 'Archived Credit Log',
+                'verbose_name_plural': 'Archived Credit Logs',
+                'ordering': ['created_on'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('body', models.TextField()),
+                ('created_on', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_comments', to=settings.AUTH_USER_MODEL)),
+                ('show', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='blog.archivedshow')),
+            ],
+            options={
+                'verbose_name': 'Archived Comment',
+                'verbose_name_plural': 'Archived Comments',
+                'ordering': ['-created_on', '-id'],
+            },
+        ),
+    ]
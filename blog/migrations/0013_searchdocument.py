@@ -0,0 +1,66 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE blog_searchdocument_fts USING fts5("
+    "title, body, kind UNINDEXED, object_id UNINDEXED, "
+    "tokenize = 'porter unicode61 remove_diacritics 2')",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS blog_searchdocument_fts",
+]
+POSTGRES_FORWARD = [
+    "ALTER TABLE blog_searchdocument ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', body), 'B')"
+    ") STORED",
+    "CREATE INDEX blog_searchdocument_vector_idx ON blog_searchdocument USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS blog_searchdocument_vector_idx",
+    "ALTER TABLE blog_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    """The full-text index is backend specific, so it is created here rather than in the model."""
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('film', 'Film'), ('show', 'Show'), ('location', 'Venue'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('url', models.CharField(max_length=255)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Step 1 of 3: add Film.slug as a nullable, non-unique column so the
+    backfill (0015) can fill it before the unique index is built (0016).
+    """
+
+    dependencies = [
+        ('blog', '0013_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='film',
+            name='slug',
+            field=models.SlugField(max_length=220, null=True, blank=True, db_index=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:40
+
+from django.db import migrations
+from django.utils.text import slugify
+
+BATCH_SIZE = 500
+
+
+def backfill_slugs(apps, schema_editor):
+    """
+    Give every film a unique slug from its name, BATCH_SIZE films per UPDATE
+    batch. Films sharing a name get -2, -3... in id order, so the oldest keeps
+    the plain slug.
+    """
+    Film = apps.get_model('blog', 'Film')
+    taken = set(Film.objects.exclude(slug__isnull=True).exclude(slug='').values_list('slug', flat=True))
+    films = Film.objects.filter(slug__isnull=True) | Film.objects.filter(slug='')
+    last_pk = 0
+    while True:
+        batch = list(films.filter(pk__gt=last_pk).order_by('pk').only('pk', 'name')[:BATCH_SIZE])
+        if not batch:
+            break
+        for film in batch:
+            base = slugify(film.name)[:200] or 'film'
+            slug, suffix = base, 2
+            while slug in taken:
+                slug = f'{base}-{suffix}'
+                suffix += 1
+            taken.add(slug)
+            film.slug = slug
+        Film.objects.bulk_update(batch, ['slug'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    """Step 2 of 3: fill Film.slug for existing films."""
+
+    dependencies = [
+        ('blog', '0014_film_slug'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_slugs, migrations.RunPython.noop),
+    ]
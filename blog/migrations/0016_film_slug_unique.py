@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Step 3 of 3: make Film.slug required and unique, which also indexes it."""
+
+    dependencies = [
+        ('blog', '0015_film_slug_backfill'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='film',
+            name='slug',
+            field=models.SlugField(blank=True, help_text="Used in the film's URL; generated from the name if left blank", max_length=220, unique=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_film_slug_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['eventtime'], name='show_eventtime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['location', 'eventtime'], name='show_location_time_idx'),
+        ),
+    ]
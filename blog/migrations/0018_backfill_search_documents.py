@@ -0,0 +1,103 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:05
+
+from urllib.parse import quote
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+FTS_TABLE = 'blog_searchdocument_fts'
+
+
+# Document builders as they stood when search was added (see blog.search),
+# frozen here with the URLs of the time so later changes cannot alter this
+# migration; manage.py rebuild_search_index reindexes with the current ones.
+def film_document(film):
+    if not film.active:
+        return None
+    return film.name, film.description or '', f'/film/{quote(film.slug)}/'
+
+
+def show_document(show):
+    return f"{show.film.name} at {show.location.name}", show.body, f'/show/{show.pk}/'
+
+
+def location_document(location):
+    if not location.active:
+        return None
+    return location.name, location.owner.name if location.owner else '', f'/location/{quote(location.name)}/'
+
+
+def comment_document(comment):
+    return (
+        f"{comment.show.film.name} at {comment.show.location.name}",
+        comment.body,
+        f'/show/{comment.show_id}/',
+    )
+
+
+# kind: (model name, document builder, relations the builder reads)
+INDEXERS = {
+    'film': ('Film', film_document, ()),
+    'show': ('Show', show_document, ('film', 'location')),
+    'location': ('Location', location_document, ('owner',)),
+    'comment': ('Comment', comment_document, ('show__film', 'show__location')),
+}
+
+
+def backfill_documents(apps, schema_editor):
+    """
+    Index the films, shows, venues and comments that existed before search
+    did, BATCH_SIZE objects per bulk insert; later saves are indexed by the
+    signals in blog.signals. On SQLite each batch is also written to the FTS5
+    table, whose rowid is the document id (see 0013).
+    """
+    SearchDocument = apps.get_model('blog', 'SearchDocument')
+    sqlite = schema_editor.connection.vendor == 'sqlite'
+    for kind, (model_name, build, related) in INDEXERS.items():
+        model = apps.get_model('blog', model_name)
+        queryset = model.objects.select_related(*related).order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            documents = []
+            for obj in batch:
+                fields = build(obj)
+                if fields:
+                    title, body, url = fields
+                    documents.append(SearchDocument(kind=kind, object_id=obj.pk, title=title, body=body, url=url))
+            SearchDocument.objects.bulk_create(documents)
+            if sqlite and documents:
+                rows = SearchDocument.objects.filter(
+                    kind=kind, object_id__in=[document.object_id for document in documents]
+                ).values_list('pk', 'title', 'body', 'kind', 'object_id')
+                with schema_editor.connection.cursor() as cursor:
+                    cursor.executemany(
+                        f"INSERT INTO {FTS_TABLE} (rowid, title, body, kind, object_id) "
+                        f"VALUES (%s, %s, %s, %s, %s)",
+                        list(rows),
+                    )
+    if sqlite:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def clear_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('blog', 'SearchDocument')
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    SearchDocument.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_show_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_documents, clear_documents),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_backfill_search_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, help_text='Last progress from the process running the job; it may be resumed once this is BULK_ACTION_LEASE_SECONDS old', null=True),
+        ),
+    ]
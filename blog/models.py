@@ -1,14 +1,19 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from datetime import timedelta
 from django.utils import timezone
 from django.utils.timezone import now
+from django.utils.functional import cached_property
+from django.utils.text import slugify
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.core.validators import RegexValidator
-import requests
+from django.db.models.functions import Lower
+from . import invalidation
+from .events import publish_show_update
+from .omdb import get_title, OMDbError
 import re
 
 
@@ -17,11 +22,29 @@ class SiteUser(AbstractUser):
     Custom user model extending Django's AbstractUser.
     Adds credit system functionality for show bookings.
     """
+    email = models.EmailField("email address", blank=True, db_index=True)
     credits = models.IntegerField(blank=True, null=True, default=0)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-normalized availability lookups (see blog.availability)
+            models.Index(Lower('username'), name='siteuser_username_lower_idx'),
+            models.Index(Lower('email'), name='siteuser_email_lower_idx'),
+        ]
+
+    def grant_credits(self, amount, reason, note=''):
+        """
+        Add credits to the user's balance (or deduct, if amount is negative)
+        and record the grant for the ledger (see blog.ledger).
+        """
+        with transaction.atomic():
+            SiteUser.objects.filter(pk=self.pk).update(credits=models.F('credits') + amount)
+            CreditGrant.objects.create(user=self, amount=amount, reason=reason, note=note)
+        self.refresh_from_db(fields=['credits'])
+
     def get_active_contributions(self):
         """Return all active show contributions."""
-        return self.showcreditlog_set.filter(
+        return self.contributions.filter(
             show__status__in=['tbc', 'confirmed'],
             refunded=False
         )
@@ -32,6 +55,12 @@ class Film(models.Model):
     Represents a film that can be screened at various locations.
     """
     name = models.CharField(max_length=200)
+    slug = models.SlugField(
+        max_length=220,
+        unique=True,
+        blank=True,
+        help_text="Used in the film's URL; generated from the name if left blank"
+    )
     description = models.TextField(blank=True, null=True)
     active = models.BooleanField(default=True)
     overridecapacity = models.IntegerField(blank=True, null=True)
@@ -83,36 +112,43 @@ class Film(models.Model):
             
             # Validate against OMDB API
             try:
-                response = requests.get(
-                    'http://www.omdbapi.com/',
-                    params={
-                        'i': self.imdb_code,
-                        'apikey': settings.OMDB_API_KEY
-                    }
-                )
-                data = response.json()
-                
-                if data.get('Response') == 'False':
-                    raise ValidationError({
-                        'imdb_code': 'Invalid IMDB code: Movie not found'
-                    })
-                
-                # Compare movie title with our name (case-insensitive)
-                imdb_title = data.get('Title', '').lower()
-                our_title = self.name.lower()
-                
-                if not (imdb_title in our_title or our_title in imdb_title):
-                    raise ValidationError({
-                        'imdb_code': f'IMDB code is for "{data["Title"]}" but film name is "{self.name}"'
-                    })
-                
-            except requests.RequestException as e:
+                data = get_title(self.imdb_code)
+            except OMDbError:
                 raise ValidationError({
                     'imdb_code': 'Could not validate IMDB code: Network error'
                 })
-    
+
+            if data.get('Response') == 'False':
+                raise ValidationError({
+                    'imdb_code': 'Invalid IMDB code: Movie not found'
+                })
+
+            # Compare movie title with our name (case-insensitive)
+            imdb_title = data.get('Title', '').lower()
+            our_title = self.name.lower()
+
+            if not (imdb_title in our_title or our_title in imdb_title):
+                raise ValidationError({
+                    'imdb_code': f'IMDB code is for "{data["Title"]}" but film name is "{self.name}"'
+                })
+
+    def _unique_slug(self):
+        base = slugify(self.name)[:200] or 'film'
+        slug, suffix = base, 2
+        while Film.objects.filter(slug=slug).exclude(pk=self.pk).exists():
+            slug = f'{base}-{suffix}'
+            suffix += 1
+        return slug
+
     def save(self, *args, **kwargs):
-        self.full_clean()
+        # The slug stays fixed once set, so links survive a rename
+        if not self.slug:
+            self.slug = self._unique_slug()
+        # Saves limited to fields clean() does not look at (e.g. active) skip
+        # the validation and its OMDb lookup
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'name', 'slug', 'imdb_code'} & set(update_fields):
+            self.full_clean()
         super().save(*args, **kwargs)
 
     def has_active_shows(self):
@@ -132,7 +168,7 @@ class Film(models.Model):
         
         # Deactivate film
         self.active = False
-        self.save()
+        self.save(update_fields=['active'])
 
         return True, f"Successfully removed '{self.name}'"
 
@@ -157,10 +193,13 @@ class VenueOwner(models.Model):
     def __str__(self):
         return self.name
 
-    @property
+    @cached_property
     def active_locations(self):
-        """Return all active locations owned by this company."""
-        return self.locations.filter(active=True)
+        """
+        Return all active locations owned by this company. Loaded once per
+        instance, and from prefetch_related('locations') when available.
+        """
+        return [location for location in self.locations.all() if location.active]
 
 
 class Location(models.Model):
@@ -209,10 +248,8 @@ class Location(models.Model):
         Get all relevant contact emails for the venue.
         Returns both venue manager and owner emails if owner exists.
         """
-        emails = [self.contact_email]
-        if self.owner and self.owner.contact_email:
-            emails.append(self.owner.contact_email)
-        return list(set(emails))  # Remove any duplicates
+        from .venues import get_contact_emails
+        return get_contact_emails(self)
 
     class Meta:
         verbose_name = "Location"
@@ -289,6 +326,11 @@ class Show(models.Model):
     class Meta:
         ordering = ['eventtime']
         unique_together = ('film', 'location', 'eventtime')
+        indexes = [
+            # Date-range reads: listings and the month calendars (blog.caching)
+            models.Index(fields=['eventtime'], name='show_eventtime_idx'),
+            models.Index(fields=['location', 'eventtime'], name='show_location_time_idx'),
+        ]
         verbose_name = "Show"
         verbose_name_plural = "Shows"
 
@@ -324,15 +366,8 @@ class Show(models.Model):
 
     def can_transition_to(self, new_status):
         """Validate if the show can transition to the given status."""
-        valid_transitions = {
-            'inactive': ['tbc', 'cancelled', 'expired'],
-            'tbc': ['confirmed', 'cancelled', 'expired'],
-            'confirmed': ['completed', 'cancelled'],
-            'completed': [],  # No transitions allowed from completed
-            'cancelled': [],  # No transitions allowed from cancelled
-            'expired': [],    # No transitions allowed from expired
-        }
-        return new_status in valid_transitions.get(self.status, [])
+        from .transitions import can_transition
+        return can_transition(self.status, new_status)
 
     def notify_credit_purchase(self):
         """Send email notifications to user who contributed credits."""
@@ -368,20 +403,30 @@ class Show(models.Model):
                 f"This would exceed the venue's capacity. Maximum {remaining} credits can be added."
             )
 
-        self.credits += amount
-        user.credits -= amount
-        user.save()
+        with transaction.atomic():
+            # Both balances change with guarded UPDATEs, so a concurrent
+            # spend or contribution cannot take either past its limit
+            spent = SiteUser.objects.filter(pk=user.pk, credits__gte=amount).update(
+                credits=models.F('credits') - amount
+            )
+            if not spent:
+                raise ValidationError("Insufficient credits.")
+            room = self.location.max_capacity - amount
+            if not self._change_credits(amount, credits__lte=room):
+                raise ValidationError("This would exceed the venue's capacity.")
+
+            # Log the contribution and keep the per-user total in step
+            ShowCreditLog.objects.create(user=user, show=self, credits=amount)
+            ShowContribution.record(user, self, amount)
 
-        # Log the contribution
-        ShowCreditLog.objects.create(user=user, show=self, credits=amount)
+        user.refresh_from_db(fields=['credits'])
 
         # Send purchase confirmation email
         self.notify_credit_purchase()
 
         # Update status to TBC if the threshold is met
         if self.credits >= self.location.min_capacity and self.status == 'inactive':
-            self.status = 'tbc'
-        self.save()
+            self.transition_to('tbc')
 
     def refund_credits(self, user=None):
         """
@@ -390,40 +435,56 @@ class Show(models.Model):
         If no user is specified, refund all users (for show expiry/cancellation via admin).
         """
         if user:
-            # Individual refund
-            try:
-                log = self.credit_logs.get(user=user, refunded=False)
-                user.credits += log.credits
-                user.save()
-                
-                # Mark log as refunded
-                log.refunded = True
-                log.save()
-                
+            # Individual refund of everything the user has put in
+            with transaction.atomic():
+                logs = self.credit_logs.filter(user=user, refunded=False)
+                amount = logs.aggregate(models.Sum('credits'))['credits__sum']
+                if not amount:
+                    return False
+
+                SiteUser.objects.filter(pk=user.pk).update(
+                    credits=models.F('credits') + amount
+                )
+
+                # Mark logs and the running total as refunded
+                logs.update(refunded=True)
+                ShowContribution.objects.filter(user=user, show=self).update(
+                    total=0, refunded=True, updated_on=timezone.now()
+                )
+
                 # Update show's total credits
-                self.credits -= log.credits
-                self.save()
-                
-                return True
-                
-            except ShowCreditLog.DoesNotExist:
-                return False
-                
+                self._change_credits(-amount)
+
+            user.refresh_from_db(fields=['credits'])
+            return True
+
         else:
             # Group refund (for expired or cancelled shows via admin)
             if self.status in ['cancelled', 'expired']:
-                for log in self.credit_logs.filter(refunded=False):
-                    log.user.credits += log.credits
-                    log.user.save()
-                    
-                    # Mark log as refunded
-                    log.refunded = True
-                    log.save()
-                
+                ShowCreditLog.refund_shows([self.pk])
                 return True
                 
             return False
 
+    def _change_credits(self, delta, **conditions):
+        """
+        Add delta to the show's credits with one UPDATE, guarded by any extra
+        filter conditions. Only credits and last_modified are written; UPDATE
+        skips save() and its signals, so the live event and cache version bump
+        are sent from here. Returns False if the guard did not match.
+        """
+        now = timezone.now()
+        updated = Show.objects.filter(pk=self.pk, **conditions).update(
+            credits=models.F('credits') + delta, last_modified=now
+        )
+        if not updated:
+            return False
+        self.refresh_from_db(fields=['credits'])
+        self.last_modified = now
+        publish_show_update(self)
+        invalidation.bump(Show, [self.pk])
+        return True
+
     @property
     def days_until_expiry(self):
         """Returns days until show expires (based on SHOW_EXPIRY_DAYS setting)"""
@@ -434,14 +495,18 @@ class Show(models.Model):
         remaining = expiry_date - timezone.now()
         return max(0, remaining.days)
 
+    def transition_to(self, new_status):
+        """
+        Change status through the transition engine (see blog.transitions),
+        which also runs the refunds and notifications for the new status.
+        Returns False if the show's status does not allow it.
+        """
+        from .transitions import transition
+        return transition(self, new_status)
+
     def confirm_show(self):
         """Mark the show as confirmed and notify contributors."""
-        if self.status == 'tbc' or self.status == 'confirmed':  # Only allow confirmation from 'tbc' or 'confirmed' status
-            self.status = 'confirmed'
-            self.save()
-
-            # Notify all contributors
-            self.notify_contributors()
+        return self.transition_to('confirmed')
 
     def notify_contributors(self, resend=False):
         """Send email notifications to all users who contributed credits."""
@@ -477,25 +542,11 @@ class Show(models.Model):
 
     def mark_completed(self):
         """Mark the show as completed."""
-        if self.status == 'confirmed':
-            self.status = 'completed'
-            self.save()
+        return self.transition_to('completed')
 
     def cancel_show(self):
-        """Cancel the show and refund credits if applicable."""
-        if self.status in ['inactive', 'tbc', 'confirmed']:
-            # Refund credits for cancelled shows
-            self.refund_credits()
-
-            # Mark the show as cancelled
-            self.status = 'cancelled'
-            self.save()
-
-            # Send cancellation notification
-            self.notify_cancellation(
-                subject=f"Show Cancelled: {self.film.name} at {self.location.name}",
-                template_name='show_cancellation_email.html'
-            )
+        """Cancel the show, refund credits and notify contributors."""
+        return self.transition_to('cancelled')
 
     def notify_cancellation(self, subject, template_name):
         """Send email notifications to all users who contributed credits."""
@@ -529,23 +580,8 @@ class Show(models.Model):
                 emailed_users.add(user_email)
 
     def mark_expired(self):
-        """Mark the show as expired if it hasn't been confirmed in time."""
-        # Check if the show is in 'tbc' or 'inactive' status
-        if self.status not in ['tbc', 'inactive']:
-            return
-
-        # Refund credits as the show is considered expired
-        self.refund_credits()
-
-        # Mark the show as expired
-        self.status = 'expired'
-        self.save()
-
-        # Send the expired show notification
-        self.notify_cancellation(
-            subject=f"Show Expired: {self.film.name} at {self.location.name}",
-            template_name='show_expired_email.html'
-        )
+        """Mark the show as expired, refund credits and notify contributors."""
+        return self.transition_to('expired')
 
     def clean(self):
         """Validate show creation and updates."""
@@ -591,6 +627,107 @@ class ShowCreditLog(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.credits} credits for {self.show}"
 
+    @classmethod
+    def refund_shows(cls, show_ids):
+        """
+        Return every unrefunded contribution to the given shows to its user,
+        with one UPDATE per contributing user rather than per log entry.
+        The shows' credits are zeroed with UPDATE, so their live events and
+        cache version bumps are sent from here, once the transaction commits.
+        """
+        logs = cls.objects.filter(show_id__in=show_ids, refunded=False)
+        totals = logs.values('user').annotate(total=models.Sum('credits')).order_by()
+        for row in totals:
+            SiteUser.objects.filter(pk=row['user']).update(
+                credits=models.F('credits') + row['total']
+            )
+        logs.update(refunded=True)
+        now = timezone.now()
+        ShowContribution.objects.filter(show_id__in=show_ids, refunded=False).update(
+            total=0, refunded=True, updated_on=now
+        )
+        # Everything held on these shows has gone back to the users
+        Show.objects.filter(pk__in=show_ids).update(credits=0, last_modified=now)
+
+        shows = list(Show.objects.filter(pk__in=show_ids).select_related('location'))
+        for show in shows:
+            publish_show_update(show)
+        invalidation.bump(Show, show_ids)
+        invalidation.bump(Film, {show.film_id for show in shows})
+
+
+class CreditGrant(models.Model):
+    """
+    Credits given to a user from outside the shows: purchases, admin
+    adjustments and the opening balance recorded when the ledger started.
+    With ShowCreditLog this accounts for every credit a user holds
+    (see blog.ledger).
+    """
+    REASON_CHOICES = [
+        ('opening', 'Opening balance'),
+        ('purchase', 'Purchase'),
+        ('adjustment', 'Admin adjustment'),
+    ]
+
+    user = models.ForeignKey("SiteUser", on_delete=models.CASCADE, related_name="credit_grants")
+    amount = models.IntegerField(help_text="Negative for deductions")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    note = models.CharField(max_length=255, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_on']
+        verbose_name = "Credit Grant"
+        verbose_name_plural = "Credit Grants"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.amount} credits ({self.get_reason_display()})"
+
+
+class ShowContribution(models.Model):
+    """
+    A user's running credit total for one show, kept in step with
+    ShowCreditLog (which remains the audit trail) in the same transaction as
+    each log write. Rebuild with `manage.py rebuild_contributions`.
+    """
+    user = models.ForeignKey("SiteUser", on_delete=models.CASCADE, related_name="contributions")
+    show = models.ForeignKey("Show", on_delete=models.CASCADE, related_name="contributions")
+    total = models.PositiveIntegerField(default=0, help_text="Credits currently held on the show")
+    refunded = models.BooleanField(default=False)
+    created_on = models.DateTimeField(help_text="First contribution")
+    updated_on = models.DateTimeField(help_text="Latest contribution or refund")
+
+    class Meta:
+        ordering = ['created_on']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'show'], name='unique_show_contribution'),
+        ]
+        verbose_name = "Show Contribution"
+        verbose_name_plural = "Show Contributions"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.total} credits for {self.show}"
+
+    @classmethod
+    def record(cls, user, show, amount):
+        """Add amount to the user's total for show, creating the row if needed."""
+        now = timezone.now()
+        updated = cls.objects.filter(user=user, show=show).update(
+            total=models.F('total') + amount, refunded=False, updated_on=now
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user=user, show=show, total=amount, created_on=now, updated_on=now
+                )
+        except IntegrityError:
+            # Created by a concurrent request since the UPDATE above
+            cls.objects.filter(user=user, show=show).update(
+                total=models.F('total') + amount, refunded=False, updated_on=now
+            )
+
 
 class Comment(models.Model):
     """
@@ -602,7 +739,11 @@ class Comment(models.Model):
     show = models.ForeignKey("Show", on_delete=models.CASCADE, related_name="comments")
 
     class Meta:
-        ordering = ['-created_on']
+        ordering = ['-created_on', '-id']
+        indexes = [
+            # Newest-first keyset pagination of a show's comments
+            models.Index(fields=['show', '-created_on', '-id'], name='comment_show_recent_idx'),
+        ]
         verbose_name = "Comment"
         verbose_name_plural = "Comments"
 
@@ -668,3 +809,165 @@ class FAQ(models.Model):
 
     def __str__(self):
         return self.question
+
+
+class BulkActionJob(models.Model):
+    """
+    A queued admin action over many shows, processed in chunks outside the
+    request (see blog.bulk). processed is the resume point in show_ids, and
+    heartbeat the lease of the process running it.
+    """
+    ACTION_CHOICES = [
+        ('confirm', 'Mark confirmed'),
+        ('cancel', 'Mark cancelled'),
+        ('complete', 'Mark completed'),
+        ('expire', 'Mark expired'),
+        ('refund', 'Refund credits'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    show_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    processed = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, help_text="Messages for shows that were skipped or failed")
+    created_by = models.ForeignKey("SiteUser", on_delete=models.SET_NULL, null=True, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    started_on = models.DateTimeField(blank=True, null=True)
+    heartbeat = models.DateTimeField(
+        blank=True, null=True,
+        help_text="Last progress from the process running the job; it may be resumed once this is BULK_ACTION_LEASE_SECONDS old",
+    )
+    finished_on = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_on']
+        verbose_name = "Bulk Action Job"
+        verbose_name_plural = "Bulk Action Jobs"
+
+    def __str__(self):
+        return f"{self.get_action_display()} ({len(self.show_ids)} shows)"
+
+    @property
+    def total(self):
+        return len(self.show_ids)
+
+    @property
+    def percent_complete(self):
+        return int(self.processed * 100 / self.total) if self.total else 100
+
+    @property
+    def is_finished(self):
+        return self.status in ['done', 'failed']
+
+    @property
+    def summary(self):
+        """One-line outcome for the admin message."""
+        text = f"{self.get_action_display()}: {self.succeeded} of {self.total} shows updated"
+        if self.skipped:
+            text += f", {self.skipped} skipped"
+        if self.status == 'failed':
+            text += " (stopped early, see errors)"
+        return text + "."
+
+
+class ArchivedShow(models.Model):
+    """
+    A finished show moved out of the Show table by blog.archive, with its
+    original id. Read-only history; option names are copied because the
+    options themselves can change afterwards.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    body = models.TextField()
+    created_by = models.ForeignKey("SiteUser", on_delete=models.CASCADE, related_name="archived_shows")
+    created_on = models.DateTimeField()
+    last_modified = models.DateTimeField()
+    film = models.ForeignKey("Film", on_delete=models.CASCADE, related_name="archived_shows")
+    location = models.ForeignKey("Location", on_delete=models.CASCADE, related_name="archived_shows")
+    eventtime = models.DateTimeField()
+    credits = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Show.STATUS_CHOICES)
+    option_names = models.JSONField(default=list)
+    archived_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-eventtime']
+        verbose_name = "Archived Show"
+        verbose_name_plural = "Archived Shows"
+
+    def __str__(self):
+        return f"{self.film.name} at {self.location.name} - {self.eventtime}"
+
+
+class ArchivedCreditLog(models.Model):
+    """A ShowCreditLog entry for an archived show."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey("SiteUser", on_delete=models.CASCADE, related_name="archived_credit_logs")
+    show = models.ForeignKey("ArchivedShow", on_delete=models.CASCADE, related_name="credit_logs")
+    credits = models.PositiveIntegerField()
+    refunded = models.BooleanField(default=False)
+    created_on = models.DateTimeField()
+
+    class Meta:
+        ordering = ['created_on']
+        verbose_name = "Archived Credit Log"
+        verbose_name_plural = "Archived Credit Logs"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.credits} credits for {self.show}"
+
+
+class ArchivedComment(models.Model):
+    """A Comment on an archived show."""
+    id = models.BigIntegerField(primary_key=True)
+    author = models.ForeignKey("SiteUser", on_delete=models.CASCADE, related_name="archived_comments")
+    body = models.TextField()
+    created_on = models.DateTimeField()
+    show = models.ForeignKey("ArchivedShow", on_delete=models.CASCADE, related_name="comments")
+
+    class Meta:
+        ordering = ['-created_on', '-id']
+        verbose_name = "Archived Comment"
+        verbose_name_plural = "Archived Comments"
+
+    def __str__(self):
+        return f"{self.author.username} on '{self.show}'"
+
+
+class SearchDocument(models.Model):
+    """
+    The searchable text of a film, show, venue or comment (see blog.search).
+    The full-text index over title and body is created per database in the
+    migration: an FTS5 table on SQLite, a tsvector column with a GIN index
+    on PostgreSQL.
+    """
+    KIND_CHOICES = [
+        ('film', 'Film'),
+        ('show', 'Show'),
+        ('location', 'Venue'),
+        ('comment', 'Comment'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    url = models.CharField(max_length=255)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+        verbose_name = "Search Document"
+        verbose_name_plural = "Search Documents"
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import caches
+
+# Pooled async clients, one per event loop (a client cannot cross loops)
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class OMDbError(Exception):
+    """Raised when OMDb cannot be reached or returns something unreadable."""
+
+
+def _params(**params):
+    params['apikey'] = settings.OMDB_API_KEY
+    return params
+
+
+def _search_key(term):
+    digest = hashlib.md5(term.strip().lower().encode('utf-8')).hexdigest()
+    return f'omdb:search:{digest}'
+
+
+def get_title(imdb_code):
+    """
+    Fetch a single title by IMDB code (blocking).
+    Found titles are kept in the "omdb" cache; lookups that fail are not.
+    """
+    cache = caches['omdb']
+    key = f'omdb:title:{imdb_code}'
+    data = cache.get(key)
+    if data is not None:
+        return data
+    try:
+        response = requests.get(
+            settings.OMDB_API_URL,
+            params=_params(i=imdb_code),
+            timeout=settings.OMDB_TIMEOUT,
+        )
+        data = response.json()
+    except (requests.RequestException, ValueError) as e:
+        raise OMDbError(str(e)) from e
+    if data.get('Response') == 'True':
+        cache.set(key, data)
+    return data
+
+
+def _get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(timeout=settings.OMDB_TIMEOUT)
+    return client
+
+
+async def asearch_movies(term):
+    """
+    Search OMDb for movies matching term without blocking the event loop.
+    Returns a list of {'id', 'text', 'title'} dicts for the admin select box.
+    Successful searches are kept in the "omdb" cache, so retyping a term is free.
+    """
+    cache = caches['omdb']
+    key = _search_key(term)
+    results = await cache.aget(key)
+    if results is not None:
+        return results
+    try:
+        response = await _get_async_client().get(
+            settings.OMDB_API_URL,
+            params=_params(s=term, type='movie'),
+        )
+        data = response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        raise OMDbError(str(e)) from e
+
+    if data.get('Response') != 'True':
+        # Not cached: "not found" and API errors (bad key, rate limit) look alike
+        return []
+    results = [
+        {
+            'id': movie['imdbID'],
+            'text': f"{movie['Title']} ({movie['Year']})",
+            'title': movie['Title']
+        }
+        for movie in data.get('Search', [])
+    ]
+    await cache.aset(key, results)
+    return results
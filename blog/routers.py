@@ -0,0 +1,45 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Set by ReplicaRoutingMiddleware for the duration of a read-only request
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def replica_enabled():
+    return settings.REPLICA_DATABASE in settings.DATABASES
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the replica only while a request has been marked as
+    read-only (see blog.middleware.ReplicaRoutingMiddleware); every other
+    read, and every write, goes to the primary ('default').
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get() and replica_enabled():
+            return settings.REPLICA_DATABASE
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema and data from the primary
+        return db == 'default'
+
+
+class use_replica:
+    """Context manager routing reads in its block to the replica."""
+
+    def __enter__(self):
+        self._token = _read_from_replica.set(True)
+        return self
+
+    def __exit__(self, *exc_info):
+        _read_from_replica.reset(self._token)
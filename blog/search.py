@@ -0,0 +1,232 @@
+"""
+Full-text search over films, shows, venues and comments.
+
+Every searchable object has a SearchDocument holding its title, text and
+URL, kept current by the signals in blog.signals; manage.py
+rebuild_search_index rebuilds them all. The index over the documents depends
+on the database (see migration 0013):
+
+- SQLite: an FTS5 table, blog_searchdocument_fts, whose rowid is the
+  document id. It is written here alongside the documents and ranked with
+  bm25(), the title counting ten times as much as the text. It also carries
+  kind and object_id (unindexed), so queries never join the documents.
+- PostgreSQL: a generated tsvector column with a GIN index, title weighted
+  A and text B, ranked with ts_rank(). PostgreSQL keeps it current itself.
+
+Every word of a query must match, the last one as a prefix so results keep
+up with the search box as the user types.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.urls import reverse
+
+from .models import Comment, Film, Location, SearchDocument, Show
+
+FTS_TABLE = 'blog_searchdocument_fts'
+
+
+def _film(film):
+    if not film.active:
+        return None
+    return {
+        'title': film.name,
+        'body': film.description or '',
+        'url': reverse('blog_film', args=[film.slug]),
+    }
+
+
+def _show(show):
+    return {
+        'title': f"{show.film.name} at {show.location.name}",
+        'body': show.body,
+        'url': reverse('blog_detail', args=[show.pk]),
+    }
+
+
+def _location(location):
+    if not location.active:
+        return None
+    return {
+        'title': location.name,
+        'body': location.owner.name if location.owner else '',
+        'url': reverse('blog_location', args=[location.name]),
+    }
+
+
+def _comment(comment):
+    return {
+        'title': f"{comment.show.film.name} at {comment.show.location.name}",
+        'body': comment.body,
+        'url': reverse('blog_detail', args=[comment.show_id]),
+    }
+
+
+# kind: (model, document builder, relations the builder reads)
+INDEXERS = {
+    'film': (Film, _film, ()),
+    'show': (Show, _show, ('film', 'location')),
+    'location': (Location, _location, ('owner',)),
+    'comment': (Comment, _comment, ('show__film', 'show__location')),
+}
+
+KINDS = {model: kind for kind, (model, build, related) in INDEXERS.items()}
+
+
+def _write_connection():
+    return connections[router.db_for_write(SearchDocument)]
+
+
+def _delete(kind, object_ids):
+    documents = SearchDocument.objects.filter(kind=kind, object_id__in=object_ids)
+    connection = _write_connection()
+    if connection.vendor == 'sqlite':
+        document_ids = list(documents.values_list('pk', flat=True))
+        if document_ids:
+            placeholders = ', '.join(['%s'] * len(document_ids))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", document_ids
+                )
+    documents.delete()
+
+
+def _write(kind, objects):
+    """
+    Replace the documents for objects, which must all be of the given kind.
+    Returns the number written; objects that are not searchable have none.
+    """
+    build = INDEXERS[kind][1]
+    documents = []
+    for obj in objects:
+        fields = build(obj)
+        if fields:
+            documents.append(SearchDocument(kind=kind, object_id=obj.pk, **fields))
+
+    connection = _write_connection()
+    with transaction.atomic(using=connection.alias):
+        _delete(kind, [obj.pk for obj in objects])
+        SearchDocument.objects.bulk_create(documents)
+        if connection.vendor == 'sqlite' and documents:
+            rows = SearchDocument.objects.filter(
+                kind=kind, object_id__in=[document.object_id for document in documents]
+            ).values_list('pk', 'title', 'body', 'kind', 'object_id')
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, body, kind, object_id) "
+                    f"VALUES (%s, %s, %s, %s, %s)",
+                    list(rows),
+                )
+    return len(documents)
+
+
+def index_queryset(kind, queryset, batch_size=500):
+    """(Re)index every object in queryset, batch_size at a time. Returns the documents written."""
+    related = INDEXERS[kind][2]
+    queryset = queryset.select_related(*related).order_by('pk')
+    count = 0
+    batch = []
+    for obj in queryset.iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) == batch_size:
+            count += _write(kind, batch)
+            batch = []
+    if batch:
+        count += _write(kind, batch)
+    return count
+
+
+def index(instance):
+    """
+    Reindex a saved object. Show and comment titles carry the film and venue
+    names, so saving either also reindexes their shows and comments.
+    """
+    kind = KINDS[type(instance)]
+    _write(kind, [instance])
+    if kind in ('film', 'location'):
+        index_queryset('show', Show.objects.filter(**{kind: instance}))
+        index_queryset('comment', Comment.objects.filter(**{f'show__{kind}': instance}))
+
+
+def remove(instance):
+    """Drop the document of a deleted object."""
+    _delete(KINDS[type(instance)], [instance.pk])
+
+
+def clear():
+    """Remove every document and empty the index."""
+    connection = _write_connection()
+    with transaction.atomic(using=connection.alias):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        SearchDocument.objects.all().delete()
+
+
+def optimize():
+    """Merge the FTS5 index segments after a rebuild (SQLite only)."""
+    connection = _write_connection()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())[:settings.SEARCH_MAX_TERMS]
+
+
+def _ranked_sql(vendor, terms, kinds):
+    """SQL and params selecting (document id, object id) by rank."""
+    params = []
+    if vendor == 'sqlite':
+        # The porter tokenizer stems prefixes too. Stemming mostly trims a
+        # word to a shorter prefix, but it turns a final y into i ("roy" ->
+        # "roi", which no longer prefixes "royal"), so that y is dropped from
+        # the prefix. The last word also matches whole, stemmed as usual.
+        *words, last = terms
+        prefix = last[:-1] if len(last) > 2 and last.endswith('y') else last
+        match = ' AND '.join([f'"{word}"' for word in words] + [f'("{last}" OR "{prefix}"*)'])
+        sql = f"SELECT rowid, object_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        order = f"bm25({FTS_TABLE}, 10.0, 1.0), rowid"
+    else:
+        match = ' & '.join(terms) + ':*'
+        sql = (
+            "SELECT d.id, d.object_id FROM blog_searchdocument d, "
+            "to_tsquery('english', %s) query WHERE d.search_vector @@ query"
+        )
+        order = "ts_rank(d.search_vector, query) DESC, d.id"
+    params.append(match)
+    if kinds:
+        sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+        params.extend(kinds)
+    return f"{sql} ORDER BY {order} LIMIT %s OFFSET %s", params
+
+
+def _ranked(query, kinds, limit, offset=0):
+    terms = _terms(query)
+    if not terms:
+        return []
+    connection = connections[router.db_for_read(SearchDocument)]
+    sql, params = _ranked_sql(connection.vendor, terms, kinds)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit, offset])
+        return cursor.fetchall()
+
+
+def search(query, kinds=None, page=1):
+    """
+    One page of documents matching query, best first, optionally limited to
+    some kinds. Returns (documents, has_next).
+    """
+    page_size = settings.SEARCH_RESULTS_PER_PAGE
+    rows = _ranked(query, kinds, page_size + 1, (page - 1) * page_size)
+    ids = [document_id for document_id, object_id in rows[:page_size]]
+    documents = SearchDocument.objects.in_bulk(ids)
+    return [documents[pk] for pk in ids if pk in documents], len(rows) > page_size
+
+
+def matching_ids(query, kind):
+    """Ids of the objects of one kind matching query, best first."""
+    rows = _ranked(query, [kind], settings.SEARCH_MAX_RESULTS)
+    return [object_id for document_id, object_id in rows]
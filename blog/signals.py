@@ -0,0 +1,120 @@
+from functools import partial
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import availability, invalidation, search
+from .events import publish_show_update
+from .models import FAQ, Film, Location, Show, ShowCreditLog, ShowOption, SiteUser, VenueOwner
+from .transitions import show_transitioned
+
+VERSIONED_MODELS = (Show, Film, Location, VenueOwner, ShowOption, FAQ)
+
+
+def versioned_model_changed(sender, instance, **kwargs):
+    """Bump the version stamps of the changed row and its type (see blog.invalidation)."""
+    invalidation.bump(sender, [instance.pk])
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(versioned_model_changed, sender=model)
+    post_delete.connect(versioned_model_changed, sender=model)
+
+
+def searchable_saved(sender, instance, raw=False, **kwargs):
+    """Keep the full-text search documents current (see blog.search)."""
+    if not raw:
+        search.index(instance)
+
+
+def searchable_deleted(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+for model in search.KINDS:
+    post_save.connect(searchable_saved, sender=model)
+    post_delete.connect(searchable_deleted, sender=model)
+
+
+@receiver(m2m_changed, sender=Show.options.through)
+def show_options_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # instance is a ShowOption; pk_set holds shows, or None after clear()
+        invalidation.bump(Show, pk_set)
+    else:
+        invalidation.bump(Show, [instance.pk])
+
+
+@receiver(post_save, sender=SiteUser)
+def site_user_saved(sender, instance, **kwargs):
+    """Keep the username/email availability cache current."""
+    availability.mark_taken(instance)
+
+
+@receiver(post_delete, sender=SiteUser)
+def site_user_deleted(sender, instance, **kwargs):
+    availability.forget(instance)
+
+
+@receiver(post_save, sender=Show)
+def show_saved(sender, instance, **kwargs):
+    """
+    Push changes made through Show.save() to live viewers. Credit changes
+    (Show._change_credits) and status transitions are UPDATEs and publish
+    their own events.
+    """
+    publish_show_update(instance)
+
+
+def _notify_transition(show, target):
+    if target == 'confirmed':
+        show.notify_contributors()
+    elif target == 'cancelled':
+        show.notify_cancellation(
+            subject=f"Show Cancelled: {show.film.name} at {show.location.name}",
+            template_name='show_cancellation_email.html'
+        )
+    elif target == 'expired':
+        show.notify_cancellation(
+            subject=f"Show Expired: {show.film.name} at {show.location.name}",
+            template_name='show_expired_email.html'
+        )
+
+
+@receiver(show_transitioned, sender=Show)
+def show_status_changed(sender, target, show_ids, **kwargs):
+    """
+    Side effects of a batch of status changes (see blog.transitions), which
+    are made with UPDATE and so skip show_saved and versioned_model_changed.
+    Refunds happen in the transaction; mail goes out after it commits.
+    """
+    refunding = target in ('cancelled', 'expired')
+    if refunding:
+        # Publishes the shows' new state and bumps their versions itself
+        ShowCreditLog.refund_shows(show_ids)
+
+    shows = list(Show.objects.filter(pk__in=show_ids).select_related('film', 'location'))
+    if not refunding:
+        for show in shows:
+            publish_show_update(show)
+        invalidation.bump(Show, show_ids)
+
+    if target in ('confirmed', 'cancelled', 'expired'):
+        for show in shows:
+            # robust: a failed send is logged and does not stop the others
+            transaction.on_commit(partial(_notify_transition, show, target), robust=True)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS (WAL journal etc.) to each new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
@@ -0,0 +1,131 @@
+"""
+Sitemaps for film, show and venue pages, so crawlers find them without
+walking every listing and filter combination (robots.txt keeps them off the
+filter URLs).
+
+Sections are paged at SITEMAP_PAGE_SIZE URLs and each lastmod comes from
+Show.last_modified: a show's own, or the latest of a film's or venue's shows.
+Rendered sections are cached under the version stamps of the models they
+list (see blog.invalidation), so a crawler re-reading an unchanged sitemap
+costs a cache hit.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps import views as sitemap_views
+from django.core.cache import caches
+from django.db.models import Max
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+
+from .caching import STALE_ENTRY_TIMEOUT
+from .invalidation import versioned_key
+from .models import Film, Location, Show
+
+
+class ShowSitemap(Sitemap):
+    changefreq = 'daily'
+    models = (Show,)
+
+    @property
+    def limit(self):
+        return settings.SITEMAP_PAGE_SIZE
+
+    def items(self):
+        return Show.objects.order_by('pk').values('pk', 'last_modified')
+
+    def location(self, item):
+        return reverse('blog_detail', args=[item['pk']])
+
+    def lastmod(self, item):
+        return item['last_modified']
+
+    def get_latest_lastmod(self):
+        return Show.objects.aggregate(latest=Max('last_modified'))['latest']
+
+
+class FilmSitemap(ShowSitemap):
+    changefreq = 'weekly'
+    models = (Film, Show)
+
+    def items(self):
+        return Film.objects.filter(active=True).order_by('pk').annotate(
+            latest=Max('shows__last_modified')
+        ).values('slug', 'latest')
+
+    def location(self, item):
+        return reverse('blog_film', args=[item['slug']])
+
+    def lastmod(self, item):
+        return item['latest']
+
+    def get_latest_lastmod(self):
+        return Show.objects.filter(film__active=True).aggregate(latest=Max('last_modified'))['latest']
+
+
+class LocationSitemap(ShowSitemap):
+    changefreq = 'weekly'
+    models = (Location, Show)
+
+    def items(self):
+        return Location.objects.filter(active=True).order_by('pk').annotate(
+            latest=Max('shows__last_modified')
+        ).values('name', 'latest')
+
+    def location(self, item):
+        return reverse('blog_location', args=[item['name']])
+
+    def lastmod(self, item):
+        return item['latest']
+
+    def get_latest_lastmod(self):
+        return Show.objects.filter(location__active=True).aggregate(latest=Max('last_modified'))['latest']
+
+
+SITEMAPS = {
+    'films': FilmSitemap,
+    'shows': ShowSitemap,
+    'locations': LocationSitemap,
+}
+
+
+def _cached(request, name, models, render):
+    """
+    Serve the rendered sitemap for this URL from the fragments cache,
+    rendering it on a miss. The status and headers are cached with the
+    content, so a hit keeps the sitemap view's X-Robots-Tag and Last-Modified.
+    """
+    # URLs in a sitemap are absolute, so the host and scheme are part of the key
+    url = f"{request.scheme}://{request.get_host()}{request.get_full_path()}"
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    key = versioned_key(f'blog:sitemap:{name}:{digest}', *models)
+    cache = caches['fragments']
+    cached = cache.get(key)
+    if cached is None:
+        response = render().render()
+        cached = {
+            'content': response.content,
+            'status': response.status_code,
+            'headers': dict(response.items()),
+        }
+        cache.set(key, cached, STALE_ENTRY_TIMEOUT)
+    return HttpResponse(cached['content'], status=cached['status'], headers=cached['headers'])
+
+
+def index_response(request):
+    """The sitemap index: one entry per page of each section."""
+    return _cached(
+        request, 'index', (Film, Location, Show),
+        lambda: sitemap_views.index(request, SITEMAPS, sitemap_url_name='sitemap_section'),
+    )
+
+
+def section_response(request, section):
+    """One page (?p=) of a section."""
+    if section not in SITEMAPS:
+        raise Http404("No sitemap section: %s" % section)
+    return _cached(
+        request, section, SITEMAPS[section].models,
+        lambda: sitemap_views.sitemap(request, SITEMAPS, section=section),
+    )
@@ -0,0 +1,62 @@
+// Live credit/status updates for any show cards on the page.
+// Cards carry data-show-id; see the show_events view for the stream format.
+// Only included where the server holds streams open (SHOW_EVENTS_LIVE).
+(function() {
+    const maxShows = parseInt(document.currentScript.dataset.maxShows, 10) || 50;
+    let source = null;
+
+    function updateProgress(card, event) {
+        const bar = card.querySelector('.js-show-progress');
+        const status = card.querySelector('.js-show-status');
+        if (status) {
+            status.textContent = event.status_display;
+        }
+        if (!bar) {
+            return;
+        }
+
+        const soldOut = event.credits >= event.max_capacity;
+        const onSale = event.credits >= event.min_capacity;
+        bar.classList.toggle('bg-danger', soldOut);
+        bar.classList.toggle('bg-success', !soldOut && onSale);
+        bar.style.width = (onSale ? 100 : event.credits * 100 / event.min_capacity) + '%';
+        bar.setAttribute('aria-valuenow', event.credits);
+
+        if (soldOut) {
+            bar.textContent = 'SOLD OUT';
+        } else if (onSale) {
+            bar.textContent = 'ON SALE';
+        } else {
+            bar.textContent = event.credits + '/' + event.min_capacity + (bar.dataset.labelSuffix || '');
+        }
+    }
+
+    function connect() {
+        if (source) {
+            source.close();
+            source = null;
+        }
+
+        const cards = document.querySelectorAll('[data-show-id]');
+        const ids = new Set(Array.from(cards, card => card.dataset.showId));
+        if (!ids.size || !window.EventSource) {
+            return;
+        }
+
+        // A stream follows at most maxShows shows; follow the first ones on
+        // the page rather than asking for more and being refused
+        const params = new URLSearchParams();
+        Array.from(ids).slice(0, maxShows).forEach(id => params.append('show', id));
+        source = new EventSource('/events/shows/?' + params.toString());
+        source.addEventListener('show', function(message) {
+            const event = JSON.parse(message.data);
+            document.querySelectorAll('[data-show-id="' + event.show + '"]').forEach(card => {
+                updateProgress(card, event);
+            });
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', connect);
+    // Filtered listings are swapped in by HTMX; follow the new set of shows
+    document.addEventListener('htmx:afterSettle', connect);
+})();
@@ -1,7 +1,11 @@
 from django.utils import timezone
 from datetime import timedelta
 from .models import Show
+from .transitions import bulk_transition
+from . import archive, ledger
 from django.conf import settings
+from django.db.models import F
+from django.core.management import call_command
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,14 +19,44 @@ def check_show_expiry():
     """
     expiry_threshold = timezone.now() + timedelta(days=settings.SHOW_EXPIRY_DAYS)
     
-    # Get shows that might expire
+    # Shows that have not met their venue's minimum, expired in one statement
     expiring_shows = Show.objects.filter(
         status__in=['inactive', 'tbc'],
-        eventtime__lte=expiry_threshold
+        eventtime__lte=expiry_threshold,
+        credits__lt=F('location__min_capacity'),
     )
-    
-    for show in expiring_shows:
-        # Check if credits meet minimum threshold
-        if show.credits < show.location.min_capacity:
-            logger.info(f"Expiring show: {show.film.name} at {show.location.name}")
-            show.mark_expired() 
\ No newline at end of file
+
+    expired_ids = bulk_transition(expiring_shows, 'expired')
+    logger.info(f"Expired {len(expired_ids)} shows: {expired_ids}")
+
+
+def clear_expired_sessions():
+    """
+    Delete expired sessions from the session store.
+    A no-op for the signed-cookie backend; the cache backends expire
+    entries themselves, but cached_db still keeps rows in the database.
+    """
+    logger.info(f"Clearing expired sessions ({settings.SESSION_BACKEND} backend)")
+    call_command('clearsessions')
+
+
+def reconcile_ledger():
+    """
+    Check show and user credit balances against the credit log, repairing
+    any drift when LEDGER_AUTO_REPAIR is set.
+    """
+    report = ledger.reconcile(fix=settings.LEDGER_AUTO_REPAIR)
+    if report.shows or report.users:
+        logger.warning(
+            f"Ledger drift: {len(report.shows)} shows, {len(report.users)} users "
+            f"({'repaired' if settings.LEDGER_AUTO_REPAIR else 'not repaired'})"
+        )
+
+
+def archive_finished_shows():
+    """
+    Move shows that finished more than ARCHIVE_AFTER_DAYS ago, with their
+    credit logs and comments, to the archive tables.
+    """
+    moved = archive.archive_shows()
+    logger.info(f"Archived {moved} finished shows")
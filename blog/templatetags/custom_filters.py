@@ -79,3 +79,12 @@ def replace_settings(value):
     Usage: {{ text|replace_settings }}
     """
     return value.replace('{{MAX_FILM_VOTES}}', str(settings.MAX_FILM_VOTES))
+
+@register.inclusion_tag('show_events_script.html')
+def show_events_script():
+    """
+    Includes the live show updates script where the server can hold its
+    streams open (SHOW_EVENTS_LIVE, i.e. under ASGI).
+    Usage: {% show_events_script %}
+    """
+    return {'live': settings.SHOW_EVENTS_LIVE, 'max_shows': settings.SHOW_EVENTS_MAX_SHOWS}
@@ -0,0 +1,636 @@
+import asyncio
+import os
+import re
+import runpy
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from blog import archive, bulk, cache_backends, invalidation, ledger, search
+from blog.events import LocalBroker
+from blog.forms import CachedHelperMixin, ContactForm
+from blog.middleware import ReplicaRoutingMiddleware
+from blog.models import (
+    ArchivedShow, BulkActionJob, Comment, CreditGrant, Film, Location, SearchDocument, Show,
+    ShowContribution, ShowCreditLog, SiteUser, VenueOwner,
+)
+from blog.routers import PrimaryReplicaRouter, use_replica
+
+
+def updated_columns(queries, table):
+    """The columns set by each UPDATE of table in the captured queries."""
+    updates = []
+    for query in queries:
+        sql = query['sql']
+        match = re.match(rf'UPDATE "{table}" SET (.*?) WHERE ', sql, re.DOTALL)
+        if match:
+            updates.append(set(re.findall(r'"(\w+)" = ', match.group(1))))
+    return updates
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class BlogTestCase(TestCase):
+    """A film, a user with 50 credits, a venue for 5-10 and a show there in 30 days."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with mock.patch('blog.models.get_title', return_value={'Response': 'True', 'Title': 'Star Wars'}):
+            cls.film = Film.objects.create(name='Star Wars', imdb_code='tt0076759')
+        cls.user = SiteUser.objects.create_user('alice', 'alice@example.com', 'pw', credits=50)
+        cls.location = Location.objects.create(
+            name='Royal', contact_email='royal@example.com', min_capacity=5, max_capacity=10
+        )
+        cls.show = Show.objects.create(
+            body='A screening', created_by=cls.user, film=cls.film, location=cls.location,
+            eventtime=timezone.now() + timedelta(days=30),
+        )
+
+
+class PartialWriteTests(BlogTestCase):
+    """Credit, film and activation paths write only the columns they change."""
+
+    def setUp(self):
+        # Neither the full validation nor its OMDb lookup may run
+        patchers = [
+            mock.patch('blog.models.get_title'),
+            mock.patch.object(Film, 'full_clean'),
+        ]
+        self.get_title, self.full_clean = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    def assertNoValidation(self):
+        self.get_title.assert_not_called()
+        self.full_clean.assert_not_called()
+
+    def test_add_credits(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.show.add_credits(self.user, 3)
+
+        self.assertEqual(updated_columns(ctx.captured_queries, 'blog_show'), [{'credits', 'last_modified'}])
+        self.assertEqual(updated_columns(ctx.captured_queries, 'blog_siteuser'), [{'credits'}])
+        self.assertNoValidation()
+        self.assertEqual(self.user.credits, 47)
+        self.assertEqual(Show.objects.get(pk=self.show.pk).credits, 3)
+
+    def test_add_credits_over_capacity_writes_nothing(self):
+        Show.objects.filter(pk=self.show.pk).update(credits=9)
+        self.show.refresh_from_db()
+        with self.assertRaises(ValidationError):
+            self.show.add_credits(self.user, 3)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.credits, 50)
+        self.assertFalse(ShowCreditLog.objects.exists())
+
+    def test_refund_credits(self):
+        self.show.add_credits(self.user, 3)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(self.show.refund_credits(user=self.user))
+
+        self.assertEqual(updated_columns(ctx.captured_queries, 'blog_show'), [{'credits', 'last_modified'}])
+        self.assertEqual(updated_columns(ctx.captured_queries, 'blog_siteuser'), [{'credits'}])
+        self.assertEqual(updated_columns(ctx.captured_queries, 'blog_showcreditlog'), [{'refunded'}])
+        self.assertNoValidation()
+        self.assertEqual(self.user.credits, 50)
+
+    def test_buy_credits(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post('/buy-credits/')
+
+        self.assertEqual(updated_columns(ctx.captured_queries, 'blog_siteuser'), [{'credits'}])
+        self.assertNoValidation()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.credits, 60)
+
+    def test_film_deactivate(self):
+        film = Film.objects.get(pk=self.film.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            success, message = film.deactivate()
+
+        self.assertTrue(success, message)
+        self.assertEqual(updated_columns(ctx.captured_queries, 'blog_film'), [{'active'}])
+        self.assertNoValidation()
+        self.assertFalse(Film.objects.get(pk=film.pk).active)
+
+    def test_film_rename_is_validated(self):
+        film = Film.objects.get(pk=self.film.pk)
+        film.name = 'Star Wars: A New Hope'
+        film.save(update_fields=['name'])
+        self.full_clean.assert_called_once()
+
+    def test_activate(self):
+        SiteUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        user = SiteUser.objects.get(pk=self.user.pk)
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = default_token_generator.make_token(user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/confirm/{uid}/{token}/')
+
+        self.assertEqual(updated_columns(ctx.captured_queries, 'blog_siteuser'), [{'is_active'}])
+        self.assertNoValidation()
+        self.assertTrue(SiteUser.objects.get(pk=user.pk).is_active)
+
+
+class CachedHelperMixinTests(TestCase):
+    def test_form_without_build_helper_fails_at_definition(self):
+        with self.assertRaises(TypeError):
+            class BrokenForm(CachedHelperMixin, forms.Form):
+                pass
+
+    def test_helper_built_once_per_class(self):
+        self.assertIs(ContactForm().helper, ContactForm().helper)
+
+
+class ConditionalPageTests(BlogTestCase):
+    def assertRevalidates(self, url, change):
+        """url answers 304 while unchanged, and 200 after change() commits."""
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_film_page_changes_with_film(self):
+        def describe():
+            film = Film.objects.get(pk=self.film.pk)
+            film.description = 'Remastered'
+            film.save(update_fields=['description'])
+
+        self.assertRevalidates(f'/film/{self.film.slug}/', describe)
+
+    def test_film_page_changes_with_venue(self):
+        def rename():
+            self.location.name = 'Royal Hall'
+            self.location.save()
+
+        response = self.assertRevalidates(f'/film/{self.film.slug}/', rename)
+        self.assertContains(response, 'Royal Hall')
+
+    def test_location_page_changes_with_owner(self):
+        def assign_owner():
+            self.location.owner = VenueOwner.objects.create(name='Grand Cinemas')
+            self.location.save()
+
+        self.assertRevalidates(f'/location/{self.location.name}/', assign_owner)
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        caches['counters'].clear()
+        for module in ('blog.routers', 'blog.middleware', 'blog.invalidation'):
+            patcher = mock.patch(f'{module}.replica_enabled', return_value=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def route(self, request):
+        """The database a Show read goes to while the middleware handles request."""
+        databases = []
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            databases.append(PrimaryReplicaRouter().db_for_read(Show))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        request.resolver_match = resolve(request.path)
+        response = middleware(request)
+        return databases[0], response
+
+    def test_listing_reads_from_replica(self):
+        database, response = self.route(RequestFactory().get('/'))
+        self.assertEqual(database, 'replica')
+        self.assertNotIn('pin_primary', response.cookies)
+
+    def test_other_views_read_from_primary(self):
+        database, response = self.route(RequestFactory().get('/profile/alice/'))
+        self.assertEqual(database, 'default')
+
+    def test_write_pins_client_to_primary(self):
+        database, response = self.route(RequestFactory().post('/'))
+        self.assertEqual(database, 'default')
+        self.assertIn('pin_primary', response.cookies)
+
+        request = RequestFactory().get('/')
+        request.COOKIES['pin_primary'] = '1'
+        self.assertEqual(self.route(request)[0], 'default')
+
+    def test_reads_stay_on_primary_after_a_version_bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidation.bump(Show, [1])
+        self.assertEqual(self.route(RequestFactory().get('/'))[0], 'default')
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Show), 'default')
+        with use_replica():
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Show), 'replica')
+        self.assertEqual(PrimaryReplicaRouter().db_for_write(Show), 'default')
+
+
+class CountersCacheSettingsTests(TestCase):
+    def load_settings(self, **env):
+        """The settings module as it would load with env set."""
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(sys.modules[settings.SETTINGS_MODULE].__file__)
+
+    def test_counters_follow_redis(self):
+        config = self.load_settings(CACHE_BACKEND='redis')['CACHES']['counters']
+        self.assertEqual(config['BACKEND'], 'blog.cache_backends.MeteredRedisCache')
+
+    def test_file_counters_are_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(COUNTERS_CACHE_BACKEND='file')
+
+    def test_locmem_counters_allowed_with_debug(self):
+        loaded = self.load_settings(COUNTERS_CACHE_BACKEND='locmem')
+        self.assertTrue(loaded['DEBUG'])
+        self.assertEqual(loaded['CACHES']['counters']['BACKEND'], 'blog.cache_backends.MeteredLocMemCache')
+
+
+class BulkJobLeaseTests(BlogTestCase):
+    def running_job(self, heartbeat_age):
+        return BulkActionJob.objects.create(
+            action='cancel', show_ids=[self.show.pk], status='running',
+            heartbeat=timezone.now() - timedelta(seconds=heartbeat_age),
+        )
+
+    def test_live_job_is_not_resumed(self):
+        job = self.running_job(heartbeat_age=10)
+        self.assertIsNone(bulk.run_job(job.pk, resume=True))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), ('running', 0))
+
+    @override_settings(BULK_ACTION_LEASE_SECONDS=60)
+    def test_stale_job_is_resumed(self):
+        job = self.running_job(heartbeat_age=120)
+        self.assertIsNone(bulk.run_job(job.pk))
+        job = bulk.run_job(job.pk, resume=True)
+        self.assertEqual((job.status, job.succeeded), ('done', 1))
+        self.assertEqual(Show.objects.get(pk=self.show.pk).status, 'cancelled')
+
+    def test_job_taken_over_stops_without_writing(self):
+        job = BulkActionJob.objects.create(action='cancel', show_ids=[self.show.pk])
+
+        def taken_over(*args):
+            BulkActionJob.objects.filter(pk=job.pk).update(heartbeat=timezone.now() + timedelta(seconds=1))
+
+        with mock.patch('blog.bulk._apply_transition', side_effect=taken_over):
+            self.assertIsNone(bulk.run_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), ('running', 0))
+
+
+class RefundShowsTests(BlogTestCase):
+    def test_refund_publishes_and_bumps_after_commit(self):
+        self.show.add_credits(self.user, 4)
+        versions = invalidation.get_versions(Show, Film)
+        with mock.patch('blog.events.get_broker') as get_broker:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                ShowCreditLog.refund_shows([self.show.pk])
+            get_broker.return_value.publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        event = get_broker.return_value.publish.call_args.args[0]
+        self.assertEqual((event['show'], event['credits']), (self.show.pk, 0))
+        for before, after in zip(versions, invalidation.get_versions(Show, Film)):
+            self.assertGreater(after, before)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.credits, 50)
+
+
+class LedgerTests(BlogTestCase):
+    def setUp(self):
+        CreditGrant.objects.create(user=self.user, amount=50, reason='opening')
+        self.show.add_credits(self.user, 3)
+
+    def test_balanced_ledger_has_no_drift(self):
+        report = ledger.check()
+        self.assertEqual((report.shows, report.users), ([], []))
+
+    def test_check_reports_drift(self):
+        Show.objects.filter(pk=self.show.pk).update(credits=7)
+        SiteUser.objects.filter(pk=self.user.pk).update(credits=1)
+        report = ledger.check()
+        self.assertEqual(report.shows, [ledger.Drift(self.show.pk, 7, 3)])
+        self.assertEqual(report.users, [ledger.Drift(self.user.pk, 1, 47)])
+
+    def test_repair_writes_balances_current_under_the_lock(self):
+        Show.objects.filter(pk=self.show.pk).update(credits=7)
+        report = ledger.check()
+        # A contribution lands between the check and the repair
+        self.show.add_credits(self.user, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            repaired = ledger.repair(report)
+
+        self.assertEqual(repaired.shows, [self.show.pk])
+        self.assertEqual(Show.objects.get(pk=self.show.pk).credits, 5)
+        self.assertEqual(ledger.check()[:2], ([], []))
+
+    def test_repair_skips_rows_fixed_since_the_check(self):
+        Show.objects.filter(pk=self.show.pk).update(credits=7)
+        report = ledger.check()
+        Show.objects.filter(pk=self.show.pk).update(credits=3)
+
+        repaired = ledger.repair(report)
+        self.assertEqual((repaired.shows, repaired.skipped_shows), ([], [self.show.pk]))
+
+
+class ArchiveTests(BlogTestCase):
+    def test_archive_keeps_ids_beyond_32_bits(self):
+        big_id = 2 ** 31 + 5
+        show = Show.objects.create(
+            id=big_id, body='An old screening', created_by=self.user, film=self.film,
+            location=self.location, eventtime=timezone.now() + timedelta(days=1),
+        )
+        ShowCreditLog.objects.create(id=big_id, user=self.user, show=show, credits=2)
+        Show.objects.filter(pk=big_id).update(
+            status='completed', eventtime=timezone.now() - timedelta(days=365)
+        )
+
+        self.assertEqual(archive.archive_shows(days=30), 1)
+        self.assertFalse(Show.objects.filter(pk=big_id).exists())
+        self.assertEqual(ArchivedShow.objects.get(pk=big_id).credit_logs.get().pk, big_id)
+        self.assertTrue(Show.objects.filter(pk=self.show.pk).exists())
+
+
+class SearchTests(BlogTestCase):
+    def titles(self, query, kinds=None):
+        return [(document.kind, document.title) for document in search.search(query, kinds)[0]]
+
+    def test_last_word_matches_as_prefix(self):
+        self.assertEqual(self.titles('sta', ['film']), [('film', 'Star Wars')])
+        self.assertEqual(self.titles('wars roy'), [('show', 'Star Wars at Royal')])
+
+    def test_title_match_ranks_first(self):
+        Comment.objects.create(show=self.show, author=self.user, body='Better than the Royal ballet')
+        self.assertEqual(self.titles('royal')[0], ('location', 'Royal'))
+
+    def test_venue_rename_reindexes_its_shows(self):
+        self.location.name = 'Odeon'
+        self.location.save()
+        self.assertEqual(self.titles('odeon', ['show']), [('show', 'Star Wars at Odeon')])
+        self.assertEqual(self.titles('royal'), [])
+
+    def test_inactive_film_is_dropped(self):
+        Film.objects.get(pk=self.film.pk).deactivate()
+        self.assertEqual(self.titles('star', ['film']), [])
+
+    def test_backfill_migration_indexes_existing_objects(self):
+        migration = import_module('blog.migrations.0018_backfill_search_documents')
+        schema_editor = SimpleNamespace(connection=connection)
+        migration.clear_documents(apps, schema_editor)
+        self.assertEqual(self.titles('star'), [])
+
+        migration.backfill_documents(apps, schema_editor)
+        self.assertEqual(
+            set(SearchDocument.objects.values_list('kind', 'url')),
+            {('film', '/film/star-wars/'), ('show', f'/show/{self.show.pk}/'), ('location', '/location/Royal/')},
+        )
+        self.assertEqual(self.titles('star', ['film']), [('film', 'Star Wars')])
+
+
+class SitemapTests(BlogTestCase):
+    def setUp(self):
+        caches['fragments'].clear()
+
+    def test_cached_sitemap_keeps_headers(self):
+        first = self.client.get('/sitemap-films.xml')
+        with self.assertNumQueries(0):
+            second = self.client.get('/sitemap-films.xml')
+        for response in (first, second):
+            self.assertEqual(response['X-Robots-Tag'], 'noindex, noodp, noarchive')
+            self.assertEqual(response['Content-Type'], 'application/xml')
+            self.assertIn('Last-Modified', response)
+        self.assertEqual(first.content, second.content)
+
+    def test_index_lists_every_section(self):
+        response = self.client.get('/sitemap.xml')
+        for section in ('films', 'shows', 'locations'):
+            self.assertContains(response, f'/sitemap-{section}.xml')
+
+    def test_section_refreshes_after_a_change(self):
+        self.assertContains(self.client.get('/sitemap-locations.xml'), '/location/Royal/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Location.objects.create(name='Odeon', contact_email='odeon@example.com', min_capacity=5, max_capacity=10)
+        self.assertContains(self.client.get('/sitemap-locations.xml'), '/location/Odeon/')
+
+    def test_unknown_section_is_not_found(self):
+        self.assertEqual(self.client.get('/sitemap-comments.xml').status_code, 404)
+
+
+class LocalBrokerTests(TestCase):
+    def event(self, show, credits=0):
+        return {'show': show, 'credits': credits}
+
+    def test_subscribers_get_only_their_shows(self):
+        broker = LocalBroker()
+
+        async def listen():
+            subscription = broker.subscribe([1])
+            # Publish from another thread, as sync views do
+            for event in (self.event(2), self.event(1, credits=3)):
+                thread = threading.Thread(target=broker.publish, args=(event,))
+                thread.start()
+                thread.join()
+            return await asyncio.wait_for(subscription.get(), timeout=1)
+
+        self.assertEqual(asyncio.run(listen()), self.event(1, credits=3))
+
+    def test_slow_subscriber_keeps_latest_events(self):
+        broker = LocalBroker(queue_size=2)
+
+        async def listen():
+            subscription = broker.subscribe([1])
+            for credits in range(4):
+                broker.publish(self.event(1, credits))
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait() for i in range(subscription.queue.qsize())]
+
+        self.assertEqual(asyncio.run(listen()), [self.event(1, 2), self.event(1, 3)])
+
+    def test_unsubscribed_and_closed_loops_are_dropped(self):
+        broker = LocalBroker()
+
+        async def subscribe():
+            return broker.subscribe([1]), broker.subscribe([1])
+
+        closed, gone = asyncio.run(subscribe())
+        broker.unsubscribe(gone)
+        broker.publish(self.event(1))
+        self.assertNotIn(closed, broker._subscriptions)
+        self.assertEqual(broker._subscriptions, set())
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_stream_is_refused_under_wsgi(self):
+        self.assertEqual(self.client.get('/events/shows/?show=1').status_code, 204)
+        self.assertEqual(self.client.get('/events/shows/?show=x').status_code, 400)
+        too_many = '&'.join(f'show={pk}' for pk in range(settings.SHOW_EVENTS_MAX_SHOWS + 1))
+        self.assertEqual(self.client.get(f'/events/shows/?{too_many}').status_code, 400)
+
+
+class CacheMetricsTests(TestCase):
+    def backend(self, backend_class, location, **options):
+        alias = f'test-{backend_class.__name__}'
+        cache_backends.get_metrics(alias).reset()
+        return backend_class(location, {'ALIAS': alias, 'OPTIONS': options})
+
+    def test_every_alias_is_metered(self):
+        for alias in settings.CACHES:
+            self.assertIsInstance(caches[alias], cache_backends.MeteredCacheMixin, alias)
+            self.assertEqual(caches[alias].alias, alias)
+
+    def test_hits_and_misses(self):
+        cache = self.backend(cache_backends.MeteredLocMemCache, 'metrics-test')
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_locmem_evictions(self):
+        cache = self.backend(cache_backends.MeteredLocMemCache, 'metrics-cull', MAX_ENTRIES=2, CULL_FREQUENCY=2)
+        for key in 'abc':
+            cache.set(key, 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_file_evictions(self):
+        with tempfile.TemporaryDirectory() as location:
+            cache = self.backend(cache_backends.MeteredFileBasedCache, location, MAX_ENTRIES=2, CULL_FREQUENCY=2)
+            for key in 'abc':
+                cache.set(key, 1)
+            stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['entries'], 2)
+
+
+class RebuildContributionsTests(BlogTestCase):
+    def setUp(self):
+        self.show.add_credits(self.user, 3)
+        self.show.add_credits(self.user, 2)
+
+    def rebuild(self, *args):
+        out = StringIO()
+        call_command('rebuild_contributions', *args, stdout=out)
+        return out.getvalue()
+
+    def totals(self):
+        return list(ShowContribution.objects.values_list('user_id', 'show_id', 'total', 'refunded'))
+
+    def test_matching_contributions_are_left_alone(self):
+        self.assertIn('0 missing or wrong, 0 without log entries', self.rebuild())
+        self.assertEqual(self.totals(), [(self.user.pk, self.show.pk, 5, False)])
+
+    def test_wrong_missing_and_stale_rows_are_rebuilt(self):
+        other = Show.objects.create(
+            body='Another screening', created_by=self.user, film=self.film,
+            location=Location.objects.create(name='Odeon', contact_email='odeon@example.com', min_capacity=5, max_capacity=10),
+            eventtime=timezone.now() + timedelta(days=30),
+        )
+        ShowContribution.objects.filter(show=self.show).delete()
+        now = timezone.now()
+        ShowContribution.objects.create(user=self.user, show=other, total=4, created_on=now, updated_on=now)
+
+        self.assertIn('1 missing or wrong, 1 without log entries', self.rebuild('--batch-size', '1'))
+        self.assertEqual(self.totals(), [(self.user.pk, self.show.pk, 5, False)])
+
+    def test_dry_run_changes_nothing(self):
+        ShowContribution.objects.update(total=1)
+        self.assertIn('1 missing or wrong', self.rebuild('--dry-run'))
+        self.assertEqual(self.totals(), [(self.user.pk, self.show.pk, 1, False)])
+
+    def test_refunded_contribution(self):
+        ShowCreditLog.refund_shows([self.show.pk])
+        ShowContribution.objects.all().delete()
+        self.rebuild()
+        self.assertEqual(self.totals(), [(self.user.pk, self.show.pk, 0, True)])
+
+
+class FilmSlugTests(BlogTestCase):
+    def create_film(self, name, imdb_code):
+        with mock.patch('blog.models.get_title', return_value={'Response': 'True', 'Title': name}):
+            return Film.objects.create(name=name, imdb_code=imdb_code)
+
+    def test_films_sharing_a_name_get_numbered_slugs(self):
+        self.assertEqual(self.film.slug, 'star-wars')
+        self.assertEqual(self.create_film('Star Wars', 'tt0120915').slug, 'star-wars-2')
+        self.assertEqual(self.create_film('Star Wars', 'tt0121765').slug, 'star-wars-3')
+
+    def test_slug_survives_a_rename(self):
+        with mock.patch('blog.models.get_title', return_value={'Response': 'True', 'Title': 'Star Wars'}):
+            film = Film.objects.get(pk=self.film.pk)
+            film.name = 'Star Wars: A New Hope'
+            film.save()
+        self.assertEqual(Film.objects.get(pk=film.pk).slug, 'star-wars')
+        self.assertEqual(self.client.get('/film/star-wars/').status_code, 200)
+
+    def test_name_urls_redirect_to_the_oldest_film(self):
+        self.create_film('Star Wars', 'tt0120915')
+        response = self.client.get('/film/Star Wars/')
+        self.assertRedirects(response, '/film/star-wars/', status_code=301)
+        self.assertEqual(self.client.get('/film/Solaris/').status_code, 404)
+
+
+class ApiTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.later = Show.objects.create(
+            body='A later screening', created_by=cls.user, film=cls.film,
+            location=Location.objects.create(name='Odeon', contact_email='odeon@example.com', min_capacity=5, max_capacity=10),
+            eventtime=timezone.now() + timedelta(days=40),
+        )
+
+    def get(self, url, status=200, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status, response.content)
+        return response
+
+    def test_fields_pick_a_subset(self):
+        data = self.get(f'/api/v1/shows/{self.show.pk}/?fields=id,film_slug,location_name').json()
+        self.assertEqual(data, {'id': self.show.pk, 'film_slug': 'star-wars', 'location_name': 'Royal'})
+
+    def test_cursor_pages_in_event_order(self):
+        first = self.get('/api/v1/shows/?limit=1&fields=id').json()
+        self.assertEqual(first['results'], [{'id': self.show.pk}])
+        second = self.get(first['next']).json()
+        self.assertEqual((second['results'], second['next']), ([{'id': self.later.pk}], None))
+
+    def test_unchanged_resource_is_not_modified(self):
+        etag = self.get('/api/v1/films/')['ETag']
+        with self.assertNumQueries(0):
+            self.get('/api/v1/films/', status=304, HTTP_IF_NONE_MATCH=etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            Film.objects.filter(pk=self.film.pk).update(description='Remastered')
+            invalidation.bump(Film, [self.film.pk])
+        self.get('/api/v1/films/', HTTP_IF_NONE_MATCH=etag)
+
+    def test_bad_parameters(self):
+        for query in ('fields=secret', 'limit=0', 'status=open', 'cursor=nonsense', 'from=yesterday'):
+            self.assertIn('error', self.get(f'/api/v1/shows/?{query}', status=400).json())
+        self.get('/api/v1/films/999/', status=404)
@@ -0,0 +1,86 @@
+"""
+Show status transitions.
+
+Every status change goes through transition() or bulk_transition(). Each is a
+conditional UPDATE guarded by the statuses the target may be reached from,
+so two requests racing to change the same show cannot both succeed, and a
+bulk change touches only the shows that were eligible when it ran.
+
+Because UPDATE bypasses save(), neither post_save nor auto_now fire; instead
+last_modified is set here and show_transitioned is sent once per batch, inside
+the transaction, with the ids of the shows that actually changed. Receivers
+(see blog.signals) do the refunds, notification mail, live events and cache
+version bumps.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Show
+
+TRANSITIONS = {
+    'inactive': ['tbc', 'cancelled', 'expired'],
+    'tbc': ['confirmed', 'cancelled', 'expired'],
+    'confirmed': ['completed', 'cancelled'],
+    'completed': [],  # No transitions allowed from completed
+    'cancelled': [],  # No transitions allowed from cancelled
+    'expired': [],    # No transitions allowed from expired
+}
+
+# Sent with sender=Show, target=<new status> and show_ids=[...]
+show_transitioned = Signal()
+
+
+def can_transition(current, target):
+    """Check the transition table for current -> target."""
+    return target in TRANSITIONS.get(current, [])
+
+
+def sources_for(target):
+    """Return the statuses target may be reached from."""
+    return [status for status, targets in TRANSITIONS.items() if target in targets]
+
+
+def transition(show, target):
+    """
+    Move a single show to target if its status in the database allows it.
+    Updates the instance and returns True on success.
+    """
+    if not can_transition(show.status, target):
+        return False
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Show.objects.filter(
+            pk=show.pk, status__in=sources_for(target)
+        ).update(status=target, last_modified=now)
+        if updated:
+            show.status = target
+            show.last_modified = now
+            show_transitioned.send(sender=Show, target=target, show_ids=[show.pk])
+    return bool(updated)
+
+
+def bulk_transition(queryset, target):
+    """
+    Move every show in queryset that is eligible for target, in one UPDATE.
+    Returns the ids of the shows that changed.
+
+    The ids are read and updated in one transaction: on PostgreSQL the rows
+    are locked while that happens, and SQLite transactions here start
+    IMMEDIATE (see settings.sqlite_database), which holds the write lock.
+    """
+    sources = sources_for(target)
+    now = timezone.now()
+    with transaction.atomic():
+        show_ids = list(
+            queryset.filter(status__in=sources)
+            .select_for_update(of=('self',))
+            .values_list('pk', flat=True)
+        )
+        if not show_ids:
+            return []
+        Show.objects.filter(pk__in=show_ids, status__in=sources).update(
+            status=target, last_modified=now
+        )
+        show_transitioned.send(sender=Show, target=target, show_ids=show_ids)
+    return show_ids
@@ -3,7 +3,7 @@ from django.contrib import admin
 from django.conf import settings
 from django.conf.urls.static import static
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('reset/', views.reset, name='reset'),
@@ -12,9 +12,16 @@ urlpatterns = [
     path('confirm/<uidb64>/<token>/', views.activate, name='activate'),
     path('show/create/', views.create_show, name='create_show'),
     path("show/<int:pk>/", views.blog_detail, name="blog_detail"),
-    path('film/<str:film_name>/', views.blog_film, name='blog_film'),
+    path("show/<int:pk>/comments/", views.show_comments, name="show_comments"),
+    path("events/shows/", views.show_events, name="show_events"),
+    path('film/<str:film_slug>/', views.blog_film, name='blog_film'),
+    path('film/<str:film_slug>/calendar.ics', views.film_feed, name='film_feed'),
     path('location/<str:location_name>/', views.blog_location, name='blog_location'),
+    path('location/<str:location_name>/calendar.ics', views.location_feed, name='location_feed'),
+    path('feeds/<str:token>/shows.ics', views.user_feed, name='user_feed'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/archive/', views.profile_archive, name='profile_archive'),
+    path('archive/show/<int:pk>/', views.archived_show, name='archived_show'),
     path('buy-credits/', views.buy_credits, name='buy_credits'),
     path('show/<int:show_id>/add-credits/', views.add_credits_to_show, name='add_credits_to_show'),
     path("about/", views.blog_about, name="blog_about"),
@@ -24,10 +31,18 @@ urlpatterns = [
     path('__debug__/', include('debug_toolbar.urls')),
     path('refund-credits/<int:show_id>/', views.refund_credits_view, name='refund_credits'),
     path('films/', views.film_list, name='film_list'),
+    path('search/', views.site_search, name='search'),
+    path('calendar/', views.show_calendar, name='show_calendar'),
+    path('calendar/day/', views.calendar_day, name='calendar_day'),
     path('films/most-desired/', views.most_desired_films, name='most_desired_films'),
     path('film/vote/<int:film_id>/', views.toggle_film_vote, name='toggle_film_vote'),
     path('validate/username/', views.validate_username, name='validate_username'),
     path('validate/email/', views.validate_email, name='validate_email'),
+    path('staff/cache-stats/', views.cache_stats, name='cache_stats'),
+    path('api/v1/', include(api.urlpatterns)),
+    path('sitemap.xml', views.sitemap_index, name='sitemap_index'),
+    path('sitemap-<str:section>.xml', views.sitemap_section, name='sitemap_section'),
+    path('robots.txt', views.robots_txt, name='robots_txt'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 # Add Django site authentication urls (for login, logout, password management)
 
@@ -0,0 +1,48 @@
+"""
+Venue directory: who to contact about each location.
+
+The whole directory is built in one query and cached on the Location and
+VenueOwner version stamps (see blog.invalidation), so it is rebuilt after any
+venue or owner change and otherwise costs one cache read per request.
+"""
+from django.core.cache import cache
+
+from .invalidation import versioned_key
+from .models import Location, VenueOwner
+
+# Entries are unreachable once either version changes; this only reclaims space
+DIRECTORY_TIMEOUT = 60 * 60 * 24
+
+
+def _resolve(*emails):
+    """Drop blanks and duplicates, keeping the venue manager first."""
+    return list(dict.fromkeys(email for email in emails if email))
+
+
+def _build_directory():
+    rows = Location.objects.values_list('pk', 'contact_email', 'owner__contact_email')
+    return {pk: _resolve(email, owner_email) for pk, email, owner_email in rows}
+
+
+def get_directory():
+    """Return {location pk: [recipient emails]} for every location."""
+    key = versioned_key('blog:venue_directory', Location, VenueOwner)
+    directory = cache.get(key)
+    if directory is None:
+        directory = _build_directory()
+        cache.set(key, directory, DIRECTORY_TIMEOUT)
+    return directory
+
+
+def get_contact_emails(location):
+    """
+    Return the venue manager's email, followed by the owner's head office
+    email when the venue belongs to a chain.
+    """
+    if location.pk is not None:
+        emails = get_directory().get(location.pk)
+        if emails is not None:
+            return emails
+    # Unsaved, or created since the directory was cached in this transaction
+    owner_email = location.owner.contact_email if location.owner_id else None
+    return _resolve(location.contact_email, owner_email)
@@ -1,45 +1,67 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import get_user_model, authenticate, login
 from django.contrib.auth.forms import AuthenticationForm
-from django.http import HttpResponse, Http404, HttpResponseNotAllowed, JsonResponse
+from django.http import HttpResponse, Http404, HttpResponseNotAllowed, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django_htmx.http import retarget, reswap
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import caches
 from django.contrib import messages
-from django.core.mail import send_mail
+from asgiref.sync import sync_to_async
 from django.contrib.sites.models import Site
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.template.loader import render_to_string
+from django.template.loader import render_to_string, get_template
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.text import slugify
+from django.urls import reverse
 from django.contrib.auth.tokens import default_token_generator
 from django.conf import settings
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, Max, Case, When
 from blog.forms import (
     SiteUserCreationForm, ShowForm, CommentForm, ShowFilterForm,
     ContactForm, PasswordResetForm
 )
-from blog.models import SiteUser, Film, Show, Location, Comment, ShowCreditLog, ShowOption, FilmVote, FAQ
+from blog.models import SiteUser, Film, Show, Location, VenueOwner, Comment, ShowContribution, ShowCreditLog, ShowOption, FilmVote, FAQ, ArchivedShow, SearchDocument
+from blog.caching import get_faq_page_data, get_faq_stamp, get_cached_faq_response, set_cached_faq_response, get_film_slug_for_name, get_month_calendar
+from blog.conditional import conditional_page
+from blog.invalidation import versioned_key
+from blog.mail import asend_mail, dispatch_mail
+from blog.availability import is_taken, check_rate_limit
+from blog.events import get_broker, show_event
+from blog import ical, search, sitemaps
 from django.utils import timezone
 from django.db import connection
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.db import models
+import asyncio
+import calendar
+import json
+import os
 
 
-def reset(request):
+# Templates read request.user (the sidebar), which may hit the database, so
+# async views render through a sync wrapper.
+arender = sync_to_async(render)
+
+
+async def reset(request):
     """Handle password reset requests."""
     if request.method == 'POST':
         form = PasswordResetForm(request.POST)
         if form.is_valid():
             email = form.cleaned_data['email']
             try:
-                user = SiteUser.objects.get(email=email)
+                user = await SiteUser.objects.aget(email=email)
             except SiteUser.DoesNotExist:
                 form.add_error('email', 'No user is associated with this email address.')
-                return render(request, 'registration/password_reset.html', {'form': form})
+                return await arender(request, 'registration/password_reset.html', {'form': form})
 
             # Generate reset token
             uid = urlsafe_base64_encode(str(user.pk).encode('utf-8'))
             token = default_token_generator.make_token(user)
 
-            # Send reset email
+            # Send reset email without waiting on SMTP
             subject = 'Password Reset Request'
             message = render_to_string('registration/password_reset_email.html', {
                 'user': user,
@@ -49,28 +71,34 @@ def reset(request):
                 'protocol': 'https',
             })
 
-            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
+            dispatch_mail(
+                subject=subject,
+                message=message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[user.email],
+            )
             messages.success(request, 'A password reset email has been sent. Please check your inbox.')
             return redirect('/')
 
     else:
         form = PasswordResetForm()
 
-    return render(request, 'registration/reset.html', {'form': form})
+    return await arender(request, 'registration/reset.html', {'form': form})
 
 
-def register(request):
+async def register(request):
     """Handle user registration."""
     if request.method == 'POST':
         form = SiteUserCreationForm(request.POST)
-        if form.is_valid():
+        # Form validation queries the database (unique username/email checks)
+        if await sync_to_async(form.is_valid)():
             username = form.cleaned_data['username']
-            if SiteUser.objects.filter(username=username).exists():
+            if await SiteUser.objects.filter(username=username).aexists():
                 form.add_error('username', 'This username is already taken. Please choose a different one.')
-                return render(request, 'registration/register.html', {'form': form})
+                return await arender(request, 'registration/register.html', {'form': form})
 
             # Create user
-            user = SiteUser.objects.create_user(
+            user = await SiteUser.objects.acreate_user(
                 username=username,
                 email=form.cleaned_data['email'],
                 password=form.cleaned_data['password1'],
@@ -82,7 +110,7 @@ def register(request):
             uid = urlsafe_base64_encode(str(user.pk).encode('utf-8'))
             token = default_token_generator.make_token(user)
 
-            # Send confirmation email
+            # Send confirmation email without waiting on SMTP
             subject = 'Confirm your email'
             message = render_to_string('registration/confirmation_email.html', {
                 'user': user,
@@ -91,14 +119,19 @@ def register(request):
                 'domain': settings.SITE_DOMAIN,
             })
 
-            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
+            dispatch_mail(
+                subject=subject,
+                message=message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[user.email],
+            )
             messages.success(request, 'Please check your email to confirm your registration.')
             return redirect('/')
 
     else:
         form = SiteUserCreationForm()
 
-    return render(request, 'registration/register.html', {'form': form})
+    return await arender(request, 'registration/register.html', {'form': form})
 
 
 def activate(request, uidb64, token):
@@ -111,7 +144,7 @@ def activate(request, uidb64, token):
 
     if user and default_token_generator.check_token(user, token):
         user.is_active = True
-        user.save()
+        user.save(update_fields=['is_active'])
         messages.success(request, 'Your account has been activated. You can now log in.')
         return redirect('/')
     else:
@@ -170,9 +203,52 @@ def index(request):
     return render(request, 'index.html', context)
 
 
-def blog_film(request, film_name):
+def _show_stamp(shows):
+    """Return (latest last_modified, row count) for a Show queryset in one query."""
+    stamp = shows.aggregate(last_modified=Max('last_modified'), count=Count('id'))
+    return stamp['last_modified'], stamp['count']
+
+
+def _page_stamp(shows, *models):
+    """
+    Stamp for a page listing shows that also shows rows of models, e.g. the
+    film or venue itself. Edits to those do not touch Show.last_modified, so
+    their version stamps go in the token and the page has no Last-Modified
+    (an If-Modified-Since check would miss them).
+    """
+    last_modified, count = _show_stamp(shows)
+    return None, f"{last_modified.isoformat() if last_modified else ''}|{count}|{versioned_key('', *models)}"
+
+
+def _film_page_stamp(request, film_slug):
+    return _page_stamp(Show.objects.filter(film__slug=film_slug), Film, Location)
+
+
+def _location_page_stamp(request, location_name):
+    return _page_stamp(Show.objects.filter(location__name=location_name), Location, VenueOwner, Film)
+
+
+def _about_page_stamp(request):
+    # The about page is static; it changes only when its template does
+    origin = get_template('about.html').origin.name
+    modified = datetime.fromtimestamp(os.path.getmtime(origin), tz=dt_timezone.utc)
+    return modified, ''
+
+
+def _faq_page_stamp(request):
+    return get_faq_stamp()
+
+
+@conditional_page(_film_page_stamp)
+def blog_film(request, film_slug):
     """Display shows for a specific film."""
-    film = get_object_or_404(Film, name=film_name)
+    film = Film.objects.filter(slug=film_slug).first()
+    if film is None:
+        # Film pages used to be addressed by name
+        slug = get_film_slug_for_name(film_slug)
+        if slug is None:
+            raise Http404("No Film matches the given query.")
+        return redirect('blog_film', film_slug=slug, permanent=True)
     shows = Show.objects.filter(film=film).select_related('location').order_by("eventtime")
     form = ShowFilterForm(request.GET)
 
@@ -190,11 +266,13 @@ def blog_film(request, film_name):
         "shows": shows,
         "form": form,
         "title": f"Shows for {film.name}",
+        "film": film,
         "exclude_film_filter": True,
     }
     return render(request, "show_list.html", context)
 
 
+@conditional_page(_location_page_stamp)
 def blog_location(request, location_name):
     """Display shows for a specific location."""
     location = get_object_or_404(Location, name=location_name)
@@ -215,14 +293,53 @@ def blog_location(request, location_name):
         "shows": shows,
         "form": form,
         "title": f"Shows at {location.name}",
+        "location": location,
         "exclude_location_filter": True,
     }
     return render(request, "show_list.html", context)
 
+def _encode_comment_cursor(comment):
+    raw = f"{comment.created_on.isoformat()}|{comment.id}"
+    return urlsafe_base64_encode(raw.encode('utf-8'))
+
+
+def _decode_comment_cursor(cursor):
+    """Return (created_on, id) from a cursor, or raise ValueError."""
+    try:
+        created_on, comment_id = urlsafe_base64_decode(cursor).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_on), int(comment_id)
+    except (TypeError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _comment_page(show, before=None):
+    """
+    Return one page of a show's comments, newest first, and the cursor for
+    the next (older) page or None. Pages are keyed on (created_on, id) so
+    new comments never shift the pages a reader is scrolling through.
+    """
+    comments = Comment.objects.filter(show=show).select_related('author').order_by('-created_on', '-id')
+    if before:
+        created_on, comment_id = before
+        comments = comments.filter(
+            Q(created_on__lt=created_on) | Q(created_on=created_on, id__lt=comment_id)
+        )
+
+    page_size = settings.COMMENTS_PER_PAGE
+    page = list(comments[:page_size + 1])
+    next_cursor = _encode_comment_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
 def blog_detail(request, pk):
     """Display show details and handle comments."""
-    show = get_object_or_404(Show.objects.select_related('film', 'location', 'created_by'), pk=pk)
-    comments = Comment.objects.filter(show=show).select_related('author')
+    try:
+        show = Show.objects.select_related('film', 'location', 'created_by').get(pk=pk)
+    except Show.DoesNotExist:
+        # Finished shows move to the archive under the same id
+        if ArchivedShow.objects.filter(pk=pk).exists():
+            return redirect('archived_show', pk=pk, permanent=True)
+        raise Http404("No Show matches the given query.")
 
     if request.method == "POST":
         form = CommentForm(request.POST, request=request)
@@ -233,19 +350,94 @@ def blog_detail(request, pk):
                 show=show,
             )
             comment.save()
+            if request.htmx:
+                # Only the new comment goes back; it is prepended to the list
+                return render(request, "comment.html", {"comment": comment})
             return redirect(request.path_info)
+        if request.htmx:
+            response = render(request, "comment_form_errors.html", {"form": form})
+            return reswap(retarget(response, "#comment-form-errors"), "innerHTML")
         # No else here. Form errors will be handled in the template
     else:  # This else is for GET requests
         form = CommentForm(request=request)
 
+    comments, next_cursor = _comment_page(show)
     context = {
         "show": show,
         "comments": comments,
+        "next_cursor": next_cursor,
         "form": form,
         "can_add_credits": show.status in ['inactive', 'tbc']
     }
     return render(request, "detail.html", context)
 
+
+def show_comments(request, pk):
+    """HTMX endpoint returning the next page of older comments for a show."""
+    show = get_object_or_404(Show, pk=pk)
+    try:
+        before = _decode_comment_cursor(request.GET['before'])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest("Missing or invalid cursor")
+
+    comments, next_cursor = _comment_page(show, before)
+    return render(request, "comment_page.html", {
+        "show": show,
+        "comments": comments,
+        "next_cursor": next_cursor,
+    })
+
+def _sse_message(event):
+    return f"event: show\ndata: {json.dumps(event)}\n\n"
+
+
+async def show_events(request):
+    """
+    Server-sent events stream of credit/status updates for ?show=<id> (repeatable).
+
+    The current state of each show is sent first, then the connection stays
+    open and receives updates from the show events broker. Under WSGI a held
+    connection would pin a worker, so pages do not open streams there
+    (SHOW_EVENTS_LIVE) and any that does gets a 204, which tells EventSource
+    not to reconnect.
+    """
+    try:
+        show_ids = {int(pk) for pk in request.GET.getlist('show')}
+    except ValueError:
+        return HttpResponseBadRequest("Invalid show id")
+    if not show_ids or len(show_ids) > settings.SHOW_EVENTS_MAX_SHOWS:
+        return HttpResponseBadRequest("Between 1 and %d shows required" % settings.SHOW_EVENTS_MAX_SHOWS)
+
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    async def stream():
+        # Subscribe before taking the snapshot so no update falls in between
+        subscription = get_broker().subscribe(show_ids)
+        try:
+            yield f"retry: {settings.SHOW_EVENTS_RETRY_MS}\n\n"
+            shows = Show.objects.filter(pk__in=show_ids).select_related('location')
+            async for show in shows:
+                yield _sse_message(show_event(show))
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(), timeout=settings.SHOW_EVENTS_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse_message(event)
+        finally:
+            get_broker().unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def create_show(request):
     """Create a new show."""
@@ -311,17 +503,18 @@ def profile(request, username):
     # Get shows created by user
     shows = Show.objects.filter(created_by=profile_user)
     
-    # Get shows user has contributed credits to
+    # Get shows user has contributed credits to (one row per show)
     now = timezone.now()
-    upcoming_credited_shows = ShowCreditLog.objects.filter(
-        user=profile_user,
+    contributions = ShowContribution.objects.filter(
+        user=profile_user, refunded=False
+    ).select_related('show', 'show__film', 'show__location')
+    upcoming_credited_shows = contributions.filter(
         show__eventtime__gt=now
-    ).select_related('show', 'show__film', 'show__location').order_by('show__eventtime')
+    ).order_by('show__eventtime')
     
-    past_credited_shows = ShowCreditLog.objects.filter(
-        user=profile_user,
+    past_credited_shows = contributions.filter(
         show__eventtime__lte=now
-    ).select_related('show', 'show__film', 'show__location').order_by('-show__eventtime')
+    ).order_by('-show__eventtime')
 
     form = ShowFilterForm(request.GET)
     if form.is_valid() and form.cleaned_data.get('status') and form.cleaned_data['status'] != 'all':
@@ -337,11 +530,38 @@ def profile(request, username):
         'title': f"{profile_user.username}'s Shows",
         'total_credits': profile_user.credits,
         'active_shows_count': shows.filter(status__in=['tbc', 'confirmed']).count(),
-        'contributed_shows': profile_user.get_active_contributions().count() if is_own_profile else None
+        'contributed_shows': profile_user.get_active_contributions().count() if is_own_profile else None,
+        'calendar_feed_token': ical.user_feed_token(profile_user) if is_own_profile else None,
     }
     return render(request, 'profile.html', context)
 
 
+@login_required
+def profile_archive(request, username):
+    """Archived shows a user contributed credits to (see blog.archive)."""
+    profile_user = get_object_or_404(SiteUser, username=username)
+    shows = ArchivedShow.objects.filter(
+        credit_logs__user=profile_user
+    ).annotate(
+        user_credits=Sum('credit_logs__credits', filter=Q(credit_logs__refunded=False))
+    ).select_related('film', 'location').order_by('-eventtime')
+
+    return render(request, 'profile_archive.html', {
+        'profile_user': profile_user,
+        'is_own_profile': request.user == profile_user,
+        'shows': shows,
+    })
+
+
+def archived_show(request, pk):
+    """Read-only page for an archived show and its comments."""
+    show = get_object_or_404(
+        ArchivedShow.objects.select_related('film', 'location', 'created_by'), pk=pk
+    )
+    comments = show.comments.select_related('author')
+    return render(request, 'archived_show.html', {'show': show, 'comments': comments})
+
+
 @login_required
 def add_credits_to_show(request, show_id):
     """Add credits to a show."""
@@ -394,29 +614,37 @@ def update_show_status(request, pk):
     return redirect('blog_detail', pk=pk)
 
 
+@conditional_page(_about_page_stamp)
 def blog_about(request):
     """Display about page."""
     return render(request, 'about.html')
 
 
+@conditional_page(_faq_page_stamp)
 def blog_faq(request):
-    """Display FAQ page."""
-    faqs = FAQ.objects.filter(active=True).order_by('category', 'order', 'created_on')
-    faqs_by_category = {}
-    for faq in faqs:
-        category = faq.get_category_display()
-        if category not in faqs_by_category:
-            faqs_by_category[category] = []
-        faqs_by_category[category].append(faq)
-    
+    """
+    Display FAQ page.
+    Anonymous visitors get a fully cached response; everyone else renders
+    from the cached grouped FAQ data.
+    """
+    cacheable = request.method == 'GET' and not request.user.is_authenticated
+    if cacheable:
+        cached = get_cached_faq_response()
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
     context = {
-        'faqs_by_category': faqs_by_category,
+        'faqs_by_category': get_faq_page_data(),
         'MAX_FILM_VOTES': settings.MAX_FILM_VOTES,
     }
-    return render(request, 'faq.html', context)
+    response = render(request, 'faq.html', context)
+    if cacheable:
+        set_cached_faq_response(response)
+    return response
 
 
-def contact(request):
+async def contact(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
@@ -440,7 +668,7 @@ def contact(request):
             
             # Send email
             try:
-                send_mail(
+                await asend_mail(
                     subject=f"Contact Form: {subject}",
                     message=email_message,
                     from_email=settings.DEFAULT_FROM_EMAIL,
@@ -449,21 +677,21 @@ def contact(request):
                 )
                 
                 if request.htmx:
-                    return render(request, 'contact.html', {'success': True})
-                return render(request, 'contact.html', {'success': True})
+                    return await arender(request, 'contact.html', {'success': True})
+                return await arender(request, 'contact.html', {'success': True})
                 
             except Exception as e:
                 if request.htmx:
                     form.add_error(None, "Failed to send message. Please try again later.")
-                    return render(request, 'contact.html', {'form': form})
+                    return await arender(request, 'contact.html', {'form': form})
                 messages.error(request, "Failed to send message. Please try again later.")
         
         if request.htmx:
-            return render(request, 'contact.html', {'form': form})
+            return await arender(request, 'contact.html', {'form': form})
     else:
         form = ContactForm()
     
-    return render(request, 'contact.html', {'form': form})
+    return await arender(request, 'contact.html', {'form': form})
 
 
 @login_required
@@ -492,8 +720,7 @@ def buy_credits(request):
     """Temporary placeholder for credit purchase system."""
     if request.method == 'POST':
         # Add 10 credits to user's account
-        request.user.credits += 10
-        request.user.save()
+        request.user.grant_credits(10, 'purchase')
         messages.success(request, 'Added 10 credits to your account.')
     return redirect(request.META.get('HTTP_REFERER', 'index'))
 
@@ -507,11 +734,14 @@ def film_list(request):
         vote_count=Count('votes', filter=models.Q(votes__created_on__gt=timezone.now() - timedelta(days=30)))
     )
     
-    # Apply search filter if query exists
+    # Apply search filter if query exists, best matches first
     if search_query:
-        films = films.filter(name__icontains=search_query)
-    
-    films = films.order_by('name')
+        film_ids = search.matching_ids(search_query, 'film')
+        films = films.filter(pk__in=film_ids).order_by(
+            Case(*[When(pk=pk, then=position) for position, pk in enumerate(film_ids)])
+        ) if film_ids else films.none()
+    else:
+        films = films.order_by('name')
     
     # Initialize voting-related variables
     user_voted_films = set()
@@ -586,8 +816,31 @@ def toggle_film_vote(request, film_id):
     
     return redirect('film_list')
 
+def _availability_response(request, response):
+    if request.htmx:
+        if response['is_valid']:
+            return HttpResponse('')
+        return HttpResponse(
+            f'<div class="invalid-feedback d-block">{response["message"]}</div>'
+        )
+    return JsonResponse(response)
+
+
+def _rate_limited_response(request):
+    # HTMX leaves the page untouched on 4xx, so bursts are simply dropped
+    if request.htmx:
+        return HttpResponse('', status=429)
+    return JsonResponse(
+        {'is_valid': None, 'message': 'Too many requests. Please slow down.'},
+        status=429
+    )
+
+
 def validate_username(request):
     """Validate username availability."""
+    if not check_rate_limit(request):
+        return _rate_limited_response(request)
+
     username = request.POST.get('username', '').strip()
     response = {'is_valid': True, 'message': ''}
     
@@ -597,35 +850,221 @@ def validate_username(request):
     elif len(username) < 3:
         response['is_valid'] = False
         response['message'] = 'Username must be at least 3 characters long.'
-    elif SiteUser.objects.filter(username=username).exists():
+    elif is_taken('username', username):
         response['is_valid'] = False
         response['message'] = 'This username is already taken.'
     
-    if request.htmx:
-        if response['is_valid']:
-            return HttpResponse('')
-        return HttpResponse(
-            f'<div class="invalid-feedback d-block">{response["message"]}</div>'
-        )
-    return JsonResponse(response)
+    return _availability_response(request, response)
 
 def validate_email(request):
     """Validate email availability and format."""
+    if not check_rate_limit(request):
+        return _rate_limited_response(request)
+
     email = request.POST.get('email', '').strip()
     response = {'is_valid': True, 'message': ''}
     
     if not email:
         response['is_valid'] = False
         response['message'] = 'Email is required.'
-    elif SiteUser.objects.filter(email=email).exists():
+    elif is_taken('email', email):
         response['is_valid'] = False
         response['message'] = 'This email is already registered.'
     
+    return _availability_response(request, response)
+
+
+def _calendar_location(request):
+    """The ?location=<id> a calendar is limited to, or None for site-wide."""
+    location_id = request.GET.get('location')
+    if not location_id:
+        return None
+    try:
+        return Location.objects.get(pk=int(location_id))
+    except (ValueError, Location.DoesNotExist):
+        raise Http404("No Location matches the given query.")
+
+
+def _calendar_range():
+    """The first and last months (as dates) the calendar covers: CALENDAR_YEARS either side of this one."""
+    this_month = timezone.localdate().replace(day=1)
+    return (
+        this_month.replace(year=this_month.year - settings.CALENDAR_YEARS),
+        this_month.replace(year=this_month.year + settings.CALENDAR_YEARS),
+    )
+
+
+def show_calendar(request):
+    """
+    Month calendar of show counts per day and status, site-wide or for one
+    venue (?location=<id>), for ?month=YYYY-MM (default: this month).
+    HTMX requests get just the month grid, so it can be paged in place and
+    embedded elsewhere, e.g. beside the create show form.
+    """
+    location = _calendar_location(request)
+    today = timezone.localdate()
+    earliest, latest = _calendar_range()
+    if request.GET.get('month'):
+        try:
+            first = datetime.strptime(request.GET['month'], '%Y-%m').date()
+        except ValueError:
+            return HttpResponseBadRequest("Invalid month")
+        if not earliest <= first <= latest:
+            raise Http404("No calendar for that month")
+    else:
+        first = today.replace(day=1)
+
+    days = get_month_calendar(first.year, first.month, location.pk if location else None)
+    weeks = [
+        [
+            {
+                'date': day,
+                'in_month': day.month == first.month,
+                'is_today': day == today,
+                'total': sum(days.get(day, {}).values()),
+                'statuses': [
+                    (label, days[day][status])
+                    for status, label in Show.STATUS_CHOICES if status in days.get(day, {})
+                ],
+            }
+            for day in week
+        ]
+        for week in calendar.Calendar().monthdatescalendar(first.year, first.month)
+    ]
+    previous_month = (first - timedelta(days=1)).replace(day=1)
+    next_month = (first + timedelta(days=31)).replace(day=1)
+
+    context = {
+        'location': location,
+        'month': first,
+        'weeks': weeks,
+        'weekdays': [calendar.day_abbr[day] for day in calendar.Calendar().iterweekdays()],
+        'previous_month': previous_month.strftime('%Y-%m') if first > earliest else None,
+        'next_month': next_month.strftime('%Y-%m') if first < latest else None,
+    }
     if request.htmx:
-        if response['is_valid']:
-            return HttpResponse('')
-        return HttpResponse(
-            f'<div class="invalid-feedback d-block">{response["message"]}</div>'
-        )
-    return JsonResponse(response)
+        return render(request, 'calendar_month.html', context)
+    return render(request, 'calendar.html', context)
+
 
+def calendar_day(request):
+    """HTMX fragment listing the shows on ?date=YYYY-MM-DD, optionally at ?location=<id>."""
+    location = _calendar_location(request)
+    try:
+        day = datetime.strptime(request.GET.get('date', ''), '%Y-%m-%d')
+    except ValueError:
+        return HttpResponseBadRequest("Missing or invalid date")
+    earliest, latest = _calendar_range()
+    if not earliest <= day.date().replace(day=1) <= latest:
+        raise Http404("No calendar for that date")
+
+    start = timezone.make_aware(day)
+    shows = Show.objects.filter(
+        eventtime__gte=start, eventtime__lt=start + timedelta(days=1)
+    ).select_related('film', 'location').order_by('eventtime')
+    if location:
+        shows = shows.filter(location=location)
+    return render(request, 'calendar_day.html', {
+        'day': day.date(),
+        'location': location,
+        'shows': shows,
+    })
+
+
+def _feed_shows():
+    return Show.objects.filter(eventtime__gte=timezone.now() - timedelta(days=settings.ICAL_PAST_DAYS))
+
+
+def location_feed(request, location_name):
+    """iCalendar feed of a venue's shows."""
+    location = get_object_or_404(Location, name=location_name)
+    return ical.feed_response(
+        request, _feed_shows().filter(location=location),
+        f"Shows at {location.name}", f"{slugify(location.name)}.ics",
+    )
+
+
+def film_feed(request, film_slug):
+    """iCalendar feed of a film's screenings."""
+    film = get_object_or_404(Film, slug=film_slug)
+    return ical.feed_response(
+        request, _feed_shows().filter(film=film),
+        f"{film.name} screenings", f"{film.slug}.ics",
+    )
+
+
+def user_feed(request, token):
+    """iCalendar feed of the shows a user holds credits on, addressed by a signed token."""
+    user_id = ical.user_id_from_token(token)
+    if user_id is None:
+        raise Http404("Unknown calendar feed")
+    held = ShowCreditLog.objects.filter(user_id=user_id, refunded=False).values('show_id')
+    return ical.feed_response(
+        request, _feed_shows().filter(pk__in=held),
+        "My Classics On Screen shows", "my-shows.ics", private=True,
+    )
+
+
+def site_search(request):
+    """
+    Ranked full-text search over films, shows, venues and comments
+    (see blog.search). HTMX requests get just the results, so the search box
+    can update them as the user types and "More" can append the next page.
+    """
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind', '')
+    kinds = [kind] if kind in search.INDEXERS else None
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    results, has_next = search.search(query, kinds, page) if query else ([], False)
+    context = {
+        'query': query,
+        'kind': kind if kinds else '',
+        'kind_choices': SearchDocument.KIND_CHOICES,
+        'results': results,
+        'page': page,
+        'next_page': page + 1 if has_next else None,
+    }
+    if request.htmx:
+        return render(request, 'search_results.html', context)
+    return render(request, 'search.html', context)
+
+
+def sitemap_index(request):
+    """Index of the film, show and venue sitemaps."""
+    return sitemaps.index_response(request)
+
+
+def sitemap_section(request, section):
+    """One page of a sitemap section."""
+    return sitemaps.section_response(request, section)
+
+
+def robots_txt(request):
+    """Crawler rules: keep off filtered listings and private pages, and point at the sitemap."""
+    return render(request, 'robots.txt', {
+        'sitemap_url': request.build_absolute_uri(reverse('sitemap_index')),
+    }, content_type='text/plain')
+
+
+@staff_member_required
+def cache_stats(request):
+    """Hit/miss/eviction counts for each named cache, as seen by this process."""
+    stats = []
+    for alias in settings.CACHES:
+        backend = caches[alias]
+        stats.append({
+            'alias': alias,
+            'backend': type(backend).__name__,
+            # Caches configured without a metered backend have nothing to report
+            'stats': backend.stats() if hasattr(backend, 'stats') else {},
+        })
+    context = {
+        'cache_stats': stats,
+        'deploy_version': settings.DEPLOY_VERSION,
+        'pid': os.getpid(),
+    }
+    return render(request, 'admin/cache_stats.html', context)
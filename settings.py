@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.sites",
+    "django.contrib.sitemaps",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
@@ -55,6 +57,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "blog.middleware.ReplicaRoutingMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -95,16 +98,188 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 CRISPY_ALLOWED_TEMPLATE_PACKS = ("bootstrap5")
 
 #WSGI_APPLICATION = "personal_blog.wsgi.application"
+ASGI_APPLICATION = "asgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
+# DATABASE_PROFILE selects the backend:
+#   sqlite   - single file, WAL journal and busy timeout (see SQLITE_PRAGMAS)
+#   postgres - persistent connections, or a psycopg pool with DATABASE_POOL=1
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'sqlite')
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', '600'))
+
+
+def sqlite_database(name):
+    return {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": name,
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Take the write lock when the transaction starts, so a reader
+            # never has to upgrade mid-transaction and fail as "locked"
+            "transaction_mode": "IMMEDIATE",
+            # Seconds a writer waits for the lock before giving up
+            "timeout": 20,
+        },
+    }
+
+
+def postgres_database(host):
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv('POSTGRES_DB', 'classicsonscreen'),
+        "USER": os.getenv('POSTGRES_USER', ''),
+        "PASSWORD": os.getenv('POSTGRES_PASSWORD', ''),
+        "HOST": host,
+        "PORT": os.getenv('POSTGRES_PORT', '5432'),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if os.getenv('DATABASE_POOL') == '1':
+        # Pooling replaces persistent connections; Django requires CONN_MAX_AGE=0
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": int(os.getenv('DATABASE_POOL_MIN', '2')),
+            "max_size": int(os.getenv('DATABASE_POOL_MAX', '10')),
+            "timeout": 10,
+        }
+    else:
+        database["CONN_MAX_AGE"] = DATABASE_CONN_MAX_AGE
+    return database
+
+
+if DATABASE_PROFILE == 'postgres':
+    DATABASES = {"default": postgres_database(os.getenv('POSTGRES_HOST', 'localhost'))}
+    replica_location = os.getenv('POSTGRES_REPLICA_HOST')
+    replica_database = postgres_database
+else:
+    DATABASES = {"default": sqlite_database(os.getenv('DATABASE_NAME', BASE_DIR / "db.sqlite3"))}
+    replica_location = os.getenv('DATABASE_REPLICA_NAME')
+    replica_database = sqlite_database
+
+# Applied to every new SQLite connection (blog.signals.tune_sqlite_connection).
+# WAL lets readers carry on while a writer commits.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",    # safe with WAL; fsync at checkpoints only
+    "cache_size": -20000,       # ~20MB page cache per connection
+    "temp_store": "MEMORY",
+    "mmap_size": 134217728,     # 128MB
+}
+
+# Optional read replica. Read-only views (REPLICA_READ_VIEWS) read from it;
+# writes and requests shortly after a write use the primary.
+REPLICA_DATABASE = "replica"
+if replica_location:
+    DATABASES[REPLICA_DATABASE] = replica_database(replica_location)
+    # Tests run against a single database
+    DATABASES[REPLICA_DATABASE]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["blog.routers.PrimaryReplicaRouter"]
+REPLICA_READ_VIEWS = [
+    "index", "film_list", "most_desired_films", "blog_film",
+    "blog_location", "blog_faq", "blog_detail", "search",
+    "show_calendar", "calendar_day", "location_feed", "film_feed", "user_feed",
+    "api_shows", "api_shows_detail", "api_films", "api_films_detail",
+    "api_locations", "api_locations_detail", "api_options", "api_options_detail",
+    "sitemap_index", "sitemap_section", "robots_txt",
+]
+REPLICA_STICKY_SECONDS = 10  # read-your-writes window after a POST
+
+
+# Sessions
+# SESSION_BACKEND chooses where session data lives:
+#   db             - a django_session row per visitor, written on every change
+#   cached_db      - as db, but reads are served from the "sessions" cache
+#   cache          - "sessions" cache only; no database writes at all
+#   signed_cookies - the client's cookie; no server-side storage at all
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = "sessions"
+
+# Flash messages travel in their own cookie, so adding one never dirties the session
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+# Caches
+# CACHE_BACKEND picks the backend for the named caches:
+#   locmem - per-process memory; the default, and what tests run against
+#   file   - files under CACHE_LOCATION, shared by all processes on one host
+#   redis  - the Redis-compatible server at CACHE_REDIS_URL (Redis, Valkey, KeyDB...)
+# Every backend is metered (hits/misses/evictions, see blog.cache_backends).
+CACHE_BACKENDS = {
+    "locmem": "blog.cache_backends.MeteredLocMemCache",
+    "file": "blog.cache_backends.MeteredFileBasedCache",
+    "redis": "blog.cache_backends.MeteredRedisCache",
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_LOCATION = Path(os.getenv('CACHE_LOCATION', BASE_DIR / "cache"))
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+# Part of every cache key, so a deploy never reads entries written by the
+# previous release (whose pickled objects or templates may have changed)
+DEPLOY_VERSION = os.getenv('DEPLOY_VERSION', 'dev')
+
+
+def cache_config(alias, backend=CACHE_BACKEND, versioned=True, **extra):
+    config = {
+        "BACKEND": CACHE_BACKENDS[backend],
+        "ALIAS": alias,
+        "KEY_PREFIX": f"cos:{DEPLOY_VERSION}" if versioned else "cos",
     }
+    if backend == "locmem":
+        config["LOCATION"] = alias
+    elif backend == "file":
+        config["LOCATION"] = CACHE_LOCATION / alias
+    else:
+        # One server for every alias; the alias keeps their keys apart
+        config["LOCATION"] = CACHE_REDIS_URL
+        config["KEY_PREFIX"] += f":{alias}"
+    config.update(extra)
+    return config
+
+
+# The "sessions" cache must be shared by all worker processes for the cache
+# session backend, so it is file-based unless another shared backend is
+# configured. Sessions outlive deploys, so their keys are not versioned.
+SESSION_CACHE_BACKEND = os.getenv(
+    'SESSION_CACHE_BACKEND', 'file' if CACHE_BACKEND == 'locmem' else CACHE_BACKEND
+)
+SESSION_CACHE = cache_config("sessions", SESSION_CACHE_BACKEND, versioned=False)
+if os.getenv('SESSION_CACHE_LOCATION'):
+    SESSION_CACHE["LOCATION"] = os.getenv('SESSION_CACHE_LOCATION')
+
+# The "counters" cache holds rate limits and the version stamps every cached
+# page and fragment is keyed on (blog.invalidation), so all worker processes
+# must see the same counters and incr() must be atomic. Only redis gives both;
+# locmem (per-process) is allowed while DEBUG, for runserver and the tests.
+COUNTERS_CACHE_BACKEND = os.getenv(
+    'COUNTERS_CACHE_BACKEND', 'redis' if CACHE_BACKEND == 'redis' else 'locmem'
+)
+if COUNTERS_CACHE_BACKEND != 'redis' and not (COUNTERS_CACHE_BACKEND == 'locmem' and DEBUG):
+    raise ImproperlyConfigured(
+        f"COUNTERS_CACHE_BACKEND={COUNTERS_CACHE_BACKEND!r}: the counters cache must be shared "
+        "by every process with an atomic incr(); use 'redis' (or 'locmem' with DEBUG on)"
+    )
+
+CACHES = {
+    # Small derived data: option lists, availability answers
+    "default": cache_config("default"),
+    # Rendered HTML: whole pages and template fragments
+    "fragments": cache_config("fragments", OPTIONS={"MAX_ENTRIES": 1000}),
+    # Rate limits and version stamps, see COUNTERS_CACHE_BACKEND
+    "counters": cache_config("counters", COUNTERS_CACHE_BACKEND, TIMEOUT=None, OPTIONS={"MAX_ENTRIES": 10000}),
+    # OMDb API responses, which rarely change
+    "omdb": cache_config("omdb", TIMEOUT=60 * 60 * 24),
+    "sessions": SESSION_CACHE,
 }
 
 
@@ -168,6 +343,37 @@ ADMIN_EMAIL = 'classicsbackonscreen+admin@gmail.com'
 SITE_DOMAIN = 'daveharris.eu.pythonanywhere.com'
 
 OMDB_API_KEY = os.getenv('OMDB_API_KEY')
+OMDB_API_URL = 'http://www.omdbapi.com/'
+OMDB_TIMEOUT = 10  # seconds
+
+# Background threads used for fire-and-forget mail (blog.mail.dispatch_mail)
+MAIL_DISPATCH_WORKERS = 4
+
+# Shared-cache lifetime (seconds) for anonymous pages served with ETag/Last-Modified
+PAGE_CACHE_SECONDS = 60
+
+# Registration username/email availability checks (blog.availability)
+AVAILABILITY_TAKEN_TTL = 60 * 60 * 24  # seconds a "taken" answer is cached
+AVAILABILITY_AVAILABLE_TTL = 60        # seconds an "available" answer is cached
+AVAILABILITY_RATE_LIMIT = 20           # checks allowed per client...
+AVAILABILITY_RATE_WINDOW = 10          # ...per this many seconds
+
+# Reverse proxies in front of the app that append the client address to
+# CLIENT_ADDRESS_HEADER. With none, REMOTE_ADDR is the client.
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+CLIENT_ADDRESS_HEADER = os.getenv('CLIENT_ADDRESS_HEADER', 'HTTP_X_FORWARDED_FOR')
+
+# Comments shown per page on a show's detail page
+COMMENTS_PER_PAGE = 20
+
+# Live show progress over server-sent events (blog.events)
+SHOW_EVENTS_BROKER = 'blog.events.LocalBroker'
+# Pages only open event streams when served by ASGI; under WSGI each stream
+# would pin a worker, so listings stay as rendered
+SHOW_EVENTS_LIVE = os.getenv('SHOW_EVENTS_LIVE') == '1'
+SHOW_EVENTS_MAX_SHOWS = 50      # shows a single stream may follow
+SHOW_EVENTS_KEEPALIVE = 15      # seconds between keep-alive comments
+SHOW_EVENTS_RETRY_MS = 5000     # EventSource reconnect delay
 
 # Film voting settings
 MAX_FILM_VOTES = 2
@@ -206,4 +412,42 @@ LOGGING = {
 
 # Show timing settings
 SHOW_CREATION_MIN_DAYS = 21  # Must create shows at least 3 weeks before event
-SHOW_EXPIRY_DAYS = 14       # Shows expire 2 weeks before event if not enough credits
\ No newline at end of file
+SHOW_EXPIRY_DAYS = 14       # Shows expire 2 weeks before event if not enough credits
+# Bulk admin actions on shows (see blog.bulk)
+BULK_ACTION_CHUNK_SIZE = 25  # shows per transaction
+# 'thread' starts each job in a background thread of the web process;
+# 'command' leaves queued jobs for `manage.py run_bulk_actions`
+BULK_ACTION_RUNNER = os.getenv('BULK_ACTION_RUNNER', 'thread')
+# A running job that has not saved progress for this long is taken to be
+# abandoned, and `run_bulk_actions --resume` may pick it up
+BULK_ACTION_LEASE_SECONDS = 5 * 60
+
+# Credit ledger reconciliation (see blog.ledger)
+LEDGER_REPAIR_CHUNK_SIZE = 200  # balances per UPDATE
+# Whether the nightly check repairs drift or only reports it
+LEDGER_AUTO_REPAIR = os.getenv('LEDGER_AUTO_REPAIR') == '1'
+
+# Archive tier (see blog.archive)
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '180'))  # days after the show date
+ARCHIVE_CHUNK_SIZE = 100  # shows per transaction
+
+# Full-text search (see blog.search)
+SEARCH_RESULTS_PER_PAGE = 20
+SEARCH_MAX_RESULTS = 200  # matches considered when filtering a listing, e.g. films
+SEARCH_MAX_TERMS = 8  # words of a query used
+
+# Years either side of today the show calendar can be paged to
+CALENDAR_YEARS = 10
+
+# iCalendar feeds (see blog.ical)
+ICAL_EVENT_MINUTES = 150  # assumed length of a show
+ICAL_REFRESH_MINUTES = 30  # polling interval suggested to calendar clients
+ICAL_PAST_DAYS = 30  # feeds keep recent shows as well as upcoming ones
+
+# Read-only JSON API (see blog.api)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_MAX_AGE = 60  # seconds shared caches may reuse a response
+
+# Sitemaps (see blog.sitemaps)
+SITEMAP_PAGE_SIZE = 5000  # URLs per sitemap page; the protocol allows up to 50,000